@@ -0,0 +1,306 @@
+import gzip
+import json
+import sys
+import time
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from UA_Tract_Info import _normalize_geoid
+
+'''
+---------------------------------------------------------------------------------------------------------------------
+Joins TransitLand stops (see transitland-stop-dataset-data-dictionary.md) to census tracts and
+aggregates their service per tract: stops, departures per weekday, distinct routes and routes by vehicle type.
+- tract polygons go into a sparse multi-level grid (candidate tracts per cell, polygon edges per tract and row),
+- stops are read in chunks and located in vectorized batches with an even-odd ray test,
+- the per-tract table merges onto the geoid-keyed frames from UA_Tract_Info.py / Transform_RawData.py.
+  python Census_Reporter_API_calls/Stop_Tract_Join.py stops.csv tracts.geojsonl [Transformed_Data.csv] [out.csv]
+---------------------------------------------------------------------------------------------------------------------
+'''
+
+# GTFS route_type -> column suffix
+ROUTE_TYPES = {0: "tram", 1: "subway", 2: "rail", 3: "bus", 4: "ferry", 5: "cable_tram",
+               6: "aerial_lift", 7: "funicular", 11: "trolleybus", 12: "monorail"}
+DOW = [f"departure_count_dow{d}" for d in range(1, 8)]
+MAX_ROUTES = 5   # route_*_1 .. route_*_5 per stop row
+
+def _open(path):
+    return gzip.open(path, "rt", encoding="utf-8") if path.endswith(".gz") else open(path, encoding="utf-8")
+
+def read_tracts(path: str, geoid_prop: str = "GEOID") -> Iterator[Tuple[str, List[np.ndarray]]]:
+    """
+    (geoid, rings) per Polygon/MultiPolygon feature of a GeoJSON or GEOJSONL
+    file (.gz ok); rings are (k,2) lon/lat arrays, outer rings and holes alike.
+    """
+    with _open(path) as f:
+        if ".geojsonl" in path or ".jsonl" in path:
+            feats = (json.loads(line) for line in f if line.strip())
+        else:
+            feats = json.load(f).get("features", [])
+        for feat in feats:
+            geom = feat.get("geometry") or {}
+            if geom.get("type") == "Polygon":
+                polys = [geom["coordinates"]]
+            elif geom.get("type") == "MultiPolygon":
+                polys = geom["coordinates"]
+            else:
+                continue
+            rings = [np.asarray(r, dtype=float)[:, :2] for poly in polys for r in poly if len(r) > 2]
+            yield str((feat.get("properties") or {})[geoid_prop]), rings
+
+class TractIndex:
+    """
+    Point-in-tract lookup for many points at once.
+    Candidate tracts come from a sparse multi-level grid: a tract is filed
+    under the level whose cells (base cell * 2**level) are at least its size,
+    so it touches at most 2x2 cells whether it is a city block or half of
+    Alaska. Each candidate is then tested against only its edges in the
+    point's row (a quarter cell tall), the only edges a horizontal ray from
+    the point can cross.
+    """
+    LEVEL_SPAN = 1 << 40     # key space of one level: row * width + column
+
+    def __init__(self, geoids: List[str], rings: List[List[np.ndarray]], cell: Optional[float] = None):
+        self.geoids = np.array(geoids, dtype=object)
+        n = len(geoids)
+        flat = [r for rs in rings for r in rs]
+        a = np.concatenate(flat)
+        b = np.concatenate([np.roll(r, -1, axis=0) for r in flat])
+        vertex_tract = np.repeat(np.repeat(np.arange(n), [len(r) for r in rings]), [len(r) for r in flat])
+
+        # tract bboxes from the vertex runs of each tract (vertices are stored tract by tract)
+        starts = np.concatenate([[0], np.flatnonzero(np.diff(vertex_tract)) + 1])
+        self.bbox = np.hstack([np.minimum.reduceat(a, starts), np.maximum.reduceat(a, starts)])  # west, south, east, north
+        extent = (self.bbox[:, 2:] - self.bbox[:, :2]).max(axis=1)
+        self.cell = cell = float(cell or max(np.median(extent), 1e-6))
+        self.band = cell / 4        # edge rows; thinner rows mean fewer edges to test per point
+        self.west, self.south = self.bbox[:, :2].min(axis=0)
+
+        # level -> sorted keys of occupied cells -> candidate tracts
+        self.level = np.maximum(np.ceil(np.log2(np.maximum(extent, 1e-12) / cell)), 0).astype(np.int64)
+        size = cell * 2.0 ** self.level
+        c0 = ((self.bbox[:, :2] - (self.west, self.south)) // size[:, None]).astype(np.int64)
+        c1 = ((self.bbox[:, 2:] - (self.west, self.south)) // size[:, None]).astype(np.int64)
+        self.width = {int(l): int(np.ceil((self.bbox[:, 2].max() - self.west) / (cell * 2.0 ** l))) + 1
+                      for l in np.unique(self.level)}
+        wl = np.array([self.width[int(l)] for l in self.level])
+        w, h = c1[:, 0] - c0[:, 0] + 1, c1[:, 1] - c0[:, 1] + 1
+        t = np.repeat(np.arange(n), w * h)
+        k = np.arange(len(t)) - np.repeat(np.cumsum(w * h) - w * h, w * h)
+        keys = self.level[t] * self.LEVEL_SPAN + (c0[t, 1] + k // w[t]) * wl[t] + c0[t, 0] + k % w[t]
+        order = np.argsort(keys, kind="stable")
+        self.cell_items = t[order].astype(np.int32)
+        self.cell_keys, counts = np.unique(keys[order], return_counts=True)
+        self.cell_ptr = np.concatenate([[0], np.cumsum(counts)])
+
+        # (tract, row) -> edges; horizontal edges never cross a horizontal ray
+        keep = a[:, 1] != b[:, 1]
+        self.x0, self.y0, self.x1, self.y1 = a[keep, 0], a[keep, 1], b[keep, 0], b[keep, 1]
+        edge_tract = vertex_tract[keep]
+        r0 = self._rows(np.minimum(self.y0, self.y1))
+        span = self._rows(np.maximum(self.y0, self.y1)) - r0 + 1
+        e = np.repeat(np.arange(len(r0)), span)
+        rows = r0[e] + np.arange(len(e)) - np.repeat(np.cumsum(span) - span, span)
+        keys = edge_tract[e].astype(np.int64) * self.LEVEL_SPAN + rows
+        order = np.argsort(keys, kind="stable")
+        self.band_edges = e[order]
+        self.band_keys, counts = np.unique(keys[order], return_counts=True)
+        self.band_ptr = np.concatenate([[0], np.cumsum(counts)])
+
+    @classmethod
+    def from_file(cls, path: str, geoid_prop: str = "GEOID", cell: Optional[float] = None) -> "TractIndex":
+        geoids, rings = [], []
+        for g, rs in read_tracts(path, geoid_prop):
+            if rs:
+                geoids.append(_normalize_geoid(g))
+                rings.append(rs)
+        if not geoids:
+            raise ValueError(f"no tract polygons in {path}")
+        return cls(geoids, rings, cell)
+
+    def __len__(self):
+        return len(self.geoids)
+
+    def _rows(self, y):
+        return ((y - self.south) // self.band).astype(np.int64)
+
+    @staticmethod
+    def _expand(ptr, pos, hit):
+        """For lookups at CSR positions `pos` (ignored where not `hit`): (lookup of each item, item offsets)."""
+        start = np.where(hit, ptr[pos], 0)
+        cnt = np.where(hit, ptr[pos + 1] - ptr[pos], 0)
+        q = np.repeat(np.arange(len(pos)), cnt)
+        return q, np.repeat(start - np.cumsum(cnt) + cnt, cnt) + np.arange(len(q))
+
+    @staticmethod
+    def _find(sorted_keys, keys):
+        pos = np.minimum(np.searchsorted(sorted_keys, keys), len(sorted_keys) - 1)
+        return pos, sorted_keys[pos] == keys
+
+    def locate(self, lon: np.ndarray, lat: np.ndarray) -> np.ndarray:
+        """Tract index of each point, -1 outside every tract (first tract wins where polygons overlap)."""
+        px, py = np.asarray(lon, dtype=float), np.asarray(lat, dtype=float)
+        out = np.full(len(px), -1, dtype=np.int64)
+        ok = np.flatnonzero((px >= self.west) & (py >= self.south))   # also drops NaN coordinates
+        if not len(ok):
+            return out
+        px, py = px[ok], py[ok]
+
+        # candidate (point, tract) pairs from every level, pruned by tract bbox
+        p, t = [], []
+        for l, width in self.width.items():
+            size = self.cell * 2.0 ** l
+            cx = ((px - self.west) // size).astype(np.int64)
+            cy = ((py - self.south) // size).astype(np.int64)
+            valid = cx < width
+            pos, hit = self._find(self.cell_keys, l * self.LEVEL_SPAN + cy * width + cx)
+            q, items = self._expand(self.cell_ptr, pos, hit & valid)
+            p.append(q)
+            t.append(self.cell_items[items])
+        p, t = np.concatenate(p), np.concatenate(t)
+        bb = self.bbox[t]
+        x, y = px[p], py[p]
+        m = (x >= bb[:, 0]) & (x <= bb[:, 2]) & (y >= bb[:, 1]) & (y <= bb[:, 3])
+        p, t, x, y = p[m], t[m], x[m], y[m]
+
+        # each pair's edges in the point's row
+        pos, hit = self._find(self.band_keys, t.astype(np.int64) * self.LEVEL_SPAN + self._rows(y))
+        q, items = self._expand(self.band_ptr, pos, hit)
+        e = self.band_edges[items]
+
+        # even-odd: count crossings of the ray going east from the point
+        y0, y1, x0, x1 = self.y0[e], self.y1[e], self.x0[e], self.x1[e]
+        yq = y[q]
+        crosses = (y0 <= yq) != (y1 <= yq)
+        xs = x0 + (yq - y0) / np.where(crosses, y1 - y0, 1.0) * (x1 - x0)
+        crosses &= xs > x[q]
+        inside = np.bincount(q[crosses], minlength=len(p)) & 1 == 1
+
+        # lowest tract index wins where polygons overlap
+        p, t = p[inside], t[inside]
+        order = np.lexsort((-t, p))
+        out[ok[p[order]]] = t[order]
+        return out
+
+def read_stops(path: str, chunksize: int = 200_000) -> Iterator[pd.DataFrame]:
+    """
+    Stop rows in chunks from a TransitLand stop CSV (.gz ok) or GEOJSONL, where
+    the columns are the feature properties and the coordinates fill stop_lon/stop_lat.
+    """
+    if ".geojsonl" in path or ".jsonl" in path:
+        with _open(path) as f:
+            buf = []
+            for line in f:
+                if not line.strip():
+                    continue
+                feat = json.loads(line)
+                rec = dict(feat.get("properties") or {})
+                if "stop_lon" not in rec:
+                    rec["stop_lon"], rec["stop_lat"] = (feat.get("geometry") or {}).get("coordinates", [None, None])[:2]
+                buf.append(rec)
+                if len(buf) == chunksize:
+                    yield pd.DataFrame(buf)
+                    buf = []
+            if buf:
+                yield pd.DataFrame(buf)
+        return
+    head = pd.read_csv(path, nrows=0).columns
+    wanted = {"stop_lon", "stop_lat", "feed_id", *DOW}
+    wanted.update(f"{c}_{k}" for k in range(1, MAX_ROUTES + 1) for c in ("agency_id", "route_id", "route_type"))
+    dtypes = {c: str for c in head if c.startswith(("agency_id", "route_id", "feed_id"))}
+    yield from pd.read_csv(path, usecols=[c for c in head if c in wanted], dtype=dtypes, chunksize=chunksize)
+
+ROUTE_KEY = ["tract", "feed_id", "agency_id", "route_id"]
+
+def _route_pairs(chunk: pd.DataFrame, tract: np.ndarray) -> pd.DataFrame:
+    """Distinct (tract, feed, agency, route) rows, with route_type, served by the located stops of one chunk."""
+    parts = []
+    for k in range(1, MAX_ROUTES + 1):
+        if f"route_id_{k}" not in chunk:
+            break
+        has = chunk[f"route_id_{k}"].notna().to_numpy() & (tract >= 0)
+        if not has.any():
+            continue
+        sub = chunk[has]
+        col = lambda name, default: sub[name].to_numpy() if name in sub else np.full(len(sub), default)
+        parts.append(pd.DataFrame({
+            "tract": tract[has],
+            "feed_id": col("feed_id", ""),
+            "agency_id": col(f"agency_id_{k}", ""),
+            "route_id": sub[f"route_id_{k}"].to_numpy(),
+            "route_type": pd.to_numeric(pd.Series(col(f"route_type_{k}", -1)), errors="coerce").fillna(-1)
+                            .astype(np.int64).to_numpy(),
+        }))
+    if not parts:
+        return pd.DataFrame(columns=ROUTE_KEY + ["route_type"])
+    return pd.concat(parts, ignore_index=True).fillna({"feed_id": "", "agency_id": ""}).drop_duplicates(ROUTE_KEY)
+
+def aggregate_stop_service(stops_path: str, index: TractIndex, chunksize: int = 200_000,
+                           verbose: bool = True) -> pd.DataFrame:
+    """
+    Per-tract service from a full stop file, streamed in chunks:
+    n_stops, departures_dow1..7 and departures_week (sums over the tract's
+    stops), n_routes (distinct feed/agency/route ids) and routes_<vehicle type>
+    (distinct routes per GTFS route_type). One row per tract of `index`, keyed by geoid.
+    """
+    n = len(index)
+    n_stops = np.zeros(n, dtype=np.int64)
+    departures = np.zeros((n, len(DOW)))
+    pairs = []
+    rows = located = 0
+    t0 = time.perf_counter()
+    for chunk in read_stops(stops_path, chunksize):
+        lon = pd.to_numeric(chunk["stop_lon"], errors="coerce").to_numpy(float)
+        lat = pd.to_numeric(chunk["stop_lat"], errors="coerce").to_numpy(float)
+        tract = index.locate(lon, lat)
+        found = tract >= 0
+        rows += len(chunk)
+        located += int(found.sum())
+        n_stops += np.bincount(tract[found], minlength=n)
+        for d, col in enumerate(DOW):
+            if col in chunk:
+                w = pd.to_numeric(chunk[col], errors="coerce").fillna(0).to_numpy(float)
+                departures[:, d] += np.bincount(tract[found], weights=w[found], minlength=n)
+        pairs.append(_route_pairs(chunk, tract))
+        if verbose:
+            dt = time.perf_counter() - t0
+            print(f"\r{rows:,} stops, {located:,} in a tract, {rows / dt:,.0f} rows/sec", end="", file=sys.stderr)
+    if verbose:
+        print(file=sys.stderr)
+
+    routes = pd.concat(pairs, ignore_index=True).drop_duplicates(ROUTE_KEY) if pairs else None
+    out = {"geoid": index.geoids, "n_stops": n_stops}
+    for d in range(len(DOW)):
+        out[f"departures_dow{d + 1}"] = departures[:, d]
+    out["departures_week"] = departures.sum(axis=1)
+    t = routes["tract"].to_numpy(np.int64) if routes is not None else np.zeros(0, dtype=np.int64)
+    out["n_routes"] = np.bincount(t, minlength=n)
+    for code, name in ROUTE_TYPES.items():
+        sel = routes["route_type"].to_numpy() == code if routes is not None else np.zeros(0, dtype=bool)
+        out[f"routes_{name}"] = np.bincount(t[sel], minlength=n)
+    return pd.DataFrame(out)
+
+def merge_stop_service(df: pd.DataFrame, service: pd.DataFrame, geoid_col: str = "geoid") -> pd.DataFrame:
+    """Left-merge the per-tract service columns onto df; tracts without stops get 0."""
+    key = df[geoid_col].astype(str).map(_normalize_geoid)
+    right = service.assign(geoid=service["geoid"].astype(str).map(_normalize_geoid)).rename(
+        columns={"geoid": "__geoid_norm"})
+    out = df.assign(__geoid_norm=key.values).merge(right, on="__geoid_norm", how="left").drop(columns="__geoid_norm")
+    cols = [c for c in service.columns if c != "geoid"]
+    out[cols] = out[cols].fillna(0).astype(service[cols].dtypes.to_dict())
+    return out
+
+if __name__ == "__main__":
+    stops_path, tracts_path = sys.argv[1], sys.argv[2]
+    frame_path = sys.argv[3] if len(sys.argv) > 3 else "Census_Reporter_API_calls/Transformed_Data.csv"
+    out_path = sys.argv[4] if len(sys.argv) > 4 else "Census_Reporter_API_calls/Tract_Service.csv"
+
+    t0 = time.perf_counter()
+    index = TractIndex.from_file(tracts_path)
+    print(f"indexed {len(index):,} tracts in {time.perf_counter() - t0:.1f}s ({len(index.width)} grid levels)")
+
+    service = aggregate_stop_service(stops_path, index)
+    df = merge_stop_service(pd.read_csv(frame_path), service)
+    print(df[["geoid", "n_stops", "departures_week", "n_routes"]].describe())
+    df.to_csv(out_path, index=False)
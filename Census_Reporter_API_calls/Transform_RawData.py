@@ -1,8 +1,6 @@
 import pandas as pd
 import numpy as np
 
-df = pd.read_csv('Census_Reporter_API_calls/RawData.csv')
-
 # ---- configure once ----
 MODES = {
     "pt": "Public transportation",
@@ -25,50 +23,76 @@ BOUNDS = np.array([
     (30,35),(35,45),(45,60),(60,np.inf)
 ], dtype=object)
 
-def add_commute_summaries(df: pd.DataFrame, key: str, label: str) -> None:
-    """Appends summary columns for one mode in-place (suffix = key)."""
-    cols = [f"{b} Travel Time to Work via {label}" for b in BINS]
-    total = f"Total Travel Time to Work via {label}"
-
-    df[cols + [total]] = df[cols + [total]].apply(pd.to_numeric, errors="coerce").fillna(0.0)
-    denom = df[total].replace(0, np.nan)
+BIN_LO = np.array([lo for lo, _ in BOUNDS], float)
+BIN_HI = np.array([hi for _, hi in BOUNDS], float)
 
-    # average minutes (weighted midpoints)
-    df[f"avg_minutes_{key}"] = (df[cols].mul(MIDPOINTS, axis=1).sum(axis=1)) / denom
+def commute_stats(counts: np.ndarray, totals: np.ndarray) -> dict:
+    """
+    Summary statistics for a stack of bin-count rows, all at once.
+    counts: (..., 9) non-negative counts per BINS entry; totals: (...) mode totals.
+    One cumulative sum feeds everything: the median is found by counting bins
+    whose cumulative count is below half the binned total (searchsorted 'left'
+    per row) and interpolated within that bin; shares are differences of the
+    cumulative sum. Returns {stat name: array shaped like totals}.
+    """
+    c = np.cumsum(counts, axis=-1)
+    T = c[..., -1]
+    denom = np.where(totals == 0, np.nan, totals)
 
     # median via simple within-bin interpolation
-    def _median(row):
-        c = row.cumsum().to_numpy()
-        T = c[-1]
-        if T <= 0: return np.nan
-        t = 0.5 * T
-        i = int(np.searchsorted(c, t, "left"))
-        lo, hi = BOUNDS[i]
-        prev = 0 if i == 0 else c[i-1]
-        in_bin = row.iat[i]
-        if np.isinf(hi) or in_bin == 0: return float(lo)
-        return float(lo + (t - prev) / in_bin * (hi - lo))
-    df[f"median_minutes_{key}"] = df[cols].apply(_median, axis=1)
+    t = 0.5 * T
+    i = np.minimum((c < t[..., None]).sum(axis=-1), counts.shape[-1] - 1)
+    take = lambda a, j: np.take_along_axis(a, j[..., None], axis=-1)[..., 0]
+    prev = np.where(i > 0, take(c, np.maximum(i - 1, 0)), 0.0)
+    in_bin = take(counts, i)
+    lo, hi = BIN_LO[i], BIN_HI[i]
+    flat = np.isinf(hi) | (in_bin == 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        median = np.where(flat, lo, lo + (t - prev) / np.where(flat, 1.0, in_bin) * (hi - lo))
+    median = np.where(T > 0, median, np.nan)
 
     # thresholds & 3-bin collapse
-    short, medium, longb = cols[:5], cols[5:7], cols[7:]
-    df[f"p_under_30_{key}"] = df[short].sum(axis=1) / denom
-    df[f"p_45_plus_{key}"]  = df[longb].sum(axis=1) / denom
-    df[f"p_60_plus_{key}"]  = df[[cols[-1]]].sum(axis=1) / denom
+    short, upto_44 = c[..., 4], c[..., 6]
+    return {
+        "avg_minutes": (counts * MIDPOINTS).sum(axis=-1) / denom,
+        "median_minutes": median,
+        "p_under_30": short / denom,
+        "p_45_plus": (T - upto_44) / denom,
+        "p_60_plus": counts[..., -1] / denom,
+        "share_short": short / denom,
+        "share_medium": (upto_44 - short) / denom,
+        "share_long": (T - upto_44) / denom,
+    }
+
+def add_commute_summaries(df: pd.DataFrame, key, label: str = None) -> None:
+    """
+    Appends summary columns in-place (suffix = key) for one mode, or for every
+    mode of a {key: label} dict in a single batched call.
+    """
+    modes = key if isinstance(key, dict) else {key: label}
+    cols = {k: [f"{b} Travel Time to Work via {lbl}" for b in BINS] for k, lbl in modes.items()}
+    totals = {k: f"Total Travel Time to Work via {lbl}" for k, lbl in modes.items()}
+    used = [c for k in modes for c in cols[k] + [totals[k]]]
+
+    df[used] = df[used].apply(pd.to_numeric, errors="coerce").fillna(0.0)
+    counts = np.stack([df[cols[k]].to_numpy(float) for k in modes], axis=1)     # (tracts, modes, bins)
+    total = np.stack([df[totals[k]].to_numpy(float) for k in modes], axis=1)    # (tracts, modes)
+    stats = commute_stats(counts, total)
 
-    df[f"share_short_{key}"]  = df[short].sum(axis=1) / denom
-    df[f"share_medium_{key}"] = df[medium].sum(axis=1) / denom
-    df[f"share_long_{key}"]   = df[longb].sum(axis=1) / denom
+    new = {f"{name}_{k}": stats[name][:, m] for m, k in enumerate(modes) for name in stats}
+    for col, values in new.items():
+        df[col] = values
 
-# ---- use on your DataFrame `df` ----
-for k, lbl in MODES.items():
-    add_commute_summaries(df, k, lbl)
+if __name__ == "__main__":
+    # ---- use on your DataFrame `df` ----
+    df = pd.read_csv('Census_Reporter_API_calls/RawData.csv')
+    add_commute_summaries(df, MODES)   # all modes in one pass
 
-# Example: keep just the new columns (plus an id)
-keep = ["geoid"] + [c for c in df.columns if c.endswith("_pt") or c.endswith("_drive")]
-df_out = df[keep]
+    # Example: keep just the new columns (plus an id)
+    keep = ["geoid"] + [c for c in df.columns if c.endswith("_pt") or c.endswith("_drive")]
+    df_out = df[keep]
 
-print(df.head())
-print(df.columns)
+    print(df.head())
+    print(df.columns)
 
-df.to_csv('/workspaces/Urban-Ant/Census_Reporter_API_calls/Transformed_Data.csv', index = False)
\ No newline at end of file
+    df.to_csv('/workspaces/Urban-Ant/Census_Reporter_API_calls/Transformed_Data.csv', index = False)
\ No newline at end of file
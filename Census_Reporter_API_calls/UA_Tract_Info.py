@@ -1,20 +1,15 @@
 import pandas as pd
 import numpy as np
 import math
+import os
 import time
 import json
-from typing import Iterable, List, Tuple
+from typing import Iterable, List, Optional, Tuple, Union
 import requests
 from concurrent.futures import ThreadPoolExecutor, as_completed
-
-# Dataset of ALL census tracts and some incorrectly named variables, used to compile on
-df = pd.read_csv('Census_Reporter_API_calls/acs_tracts_2023_ioc_features.csv')
-# print(df.head())
-
-# print(df.columns) # cols in current df
-
-df = df[['geoid', 'state_fips', 'county_fips', 'tract_code', 'NAME','pop_1plus']] # Keep only the useful columns (some names are wrong)
-# print(df.head())
+from cr_cache import ResponseCache
+import asyncio
+import cr_async
 
 
 '''
@@ -24,7 +19,8 @@ Functions to call Census reporter API for variables based on census tracts,
 ---------------------------------------------------------------------------------------------------------------------
 '''
 
-CR_BASE = "https://api.censusreporter.org/1.0/data/show"
+# Override with CR_BASE_URL (e.g. the local stub in cr_stub_server.py) to run offline
+CR_BASE = os.environ.get("CR_BASE_URL", "https://api.censusreporter.org/1.0/data/show")
 
 def _normalize_geoid(g):
     """
@@ -51,6 +47,160 @@ def _chunked(seq: Iterable[str], n: int) -> List[List[str]]:
     if chunk:
         yield chunk
 
+def _fetch_tables_batch(session, url, geoids, table_ids, timeout=15.0, max_retries=3, backoff=0.8, stats=None):
+    """
+    One request for several tables over one geoid batch.
+    Returns ({table_id: {geoid: table row}}, None), or (None, last error) once retries run out.
+    """
+    params = {"table_ids": ",".join(table_ids), "geo_ids": ",".join(geoids)}
+    last_exc = None
+    for attempt in range(max_retries):
+        try:
+            t0 = time.perf_counter()
+            r = session.get(url, params=params, timeout=timeout)
+            if stats is not None:
+                stats.record(time.perf_counter() - t0, r.status_code)
+            if r.status_code in (429, 500, 502, 503, 504):
+                raise requests.HTTPError(f"HTTP {r.status_code}", response=r)
+            r.raise_for_status()
+            data = r.json().get("data", {})
+            return {t: {g: data.get(g, {}).get(t, {}) for g in geoids} for t in table_ids}, None
+        except (requests.Timeout, requests.ConnectionError, requests.HTTPError, json.JSONDecodeError) as e:
+            last_exc = e
+            # simple exponential backoff with slight growth
+            time.sleep((backoff ** attempt) * (1.0 + 0.25 * attempt))
+    return None, last_exc
+
+def resolve_release(url, geoid, table_id, timeout=15.0, max_retries=5, backoff=0.8, cache=None):
+    """
+    Concrete release id (e.g. "acs2023_5yr") the API serves at `url`, read
+    from the release block of a one-tract request. Used to pin "latest"
+    before it becomes a cache key, so cached rows never outlive a release.
+    Throttling and transient errors are retried with jittered backoff; if
+    the API still cannot be reached, the newest release already in `cache`
+    is used instead.
+    """
+    last_exc = None
+    for attempt in range(max_retries):
+        retry_after = None
+        try:
+            r = requests.get(url, params={"table_ids": table_id, "geo_ids": geoid}, timeout=timeout)
+            if r.status_code in (429, 500, 502, 503, 504):
+                retry_after = r.headers.get("Retry-After")
+                raise requests.HTTPError(f"HTTP {r.status_code}", response=r)
+            r.raise_for_status()
+            return r.json()["release"]["id"]
+        except (requests.Timeout, requests.ConnectionError, requests.HTTPError, json.JSONDecodeError) as e:
+            last_exc = e
+            if attempt + 1 < max_retries:
+                time.sleep(cr_async._retry_delay(attempt, backoff, 30.0, retry_after))
+        except (ValueError, KeyError, TypeError) as e:
+            last_exc = e
+            break
+    cached = cache.releases() if cache is not None else []
+    if cached:
+        print(f"Warning: could not resolve the release behind {url} ({last_exc!r}); "
+              f"using the newest cached release {cached[-1]}")
+        return cached[-1]
+    raise ValueError(f"could not resolve the release behind {url} ({last_exc!r}); "
+                     f"pass an explicit acs release when using a cache") from last_exc
+
+def _plan_requests(geoids, table_ids, missing, failed, batch_size, tables_per_request):
+    """
+    Group what is missing into (table_ids, geoids) requests. Batches that failed
+    last time come first, unchanged; then every geoid batch asks, in groups of
+    `tables_per_request`, for just the tables some of its geoids still lack.
+    missing: {table_id: set of geoids}; failed: {table_id: [geoid batch, ...]}
+    """
+    requests_, by_batch = [], {}
+    for t, batches in failed.items():
+        for batch in batches:
+            if any(g in missing[t] for g in batch):
+                by_batch.setdefault(tuple(batch), []).append(t)
+    for batch, tables in by_batch.items():
+        for tg in _chunked(tables, tables_per_request):
+            requests_.append((tg, list(batch)))
+            for t in tg:
+                missing[t] = missing[t] - set(batch)
+    for chunk in _chunked(geoids, batch_size):
+        for tg in _chunked(table_ids, tables_per_request):
+            need = [t for t in tg if any(g in missing[t] for g in chunk)]
+            if need:
+                requests_.append((need, [g for g in chunk if any(g in missing[t] for t in need)]))
+    return requests_
+
+def fetch_cr_tables(
+    geoids: List[str],
+    table_ids: List[str],
+    acs: str = "latest",
+    batch_size: int = 45,
+    max_workers: int = 8,
+    request_timeout: float = 15.0,
+    tables_per_request: int = 5,
+    cache: Optional[Union[ResponseCache, str]] = None,
+    base_url: Optional[str] = None,
+    backend: str = "threads",
+    stats: Optional[cr_async.FetchStats] = None,
+    **async_options,
+) -> dict:
+    """
+    Whole table rows {table_id: {geoid: {"estimate": {...}, "error": {...}}}} for
+    normalized geoids. Each geoid batch requests up to `tables_per_request`
+    tables at once. With a `cache` (ResponseCache or SQLite path) only missing
+    rows are requested, batches that failed on an earlier run are retried as
+    they were, and failures are recorded instead of vanishing.
+    backend: "threads" (fixed pool of max_workers) or "async" (cr_async: token
+    bucket + AIMD concurrency, tuned by async_options such as rate=, max_concurrency=).
+    Either way each batch lands in the output and the cache as it completes.
+    With a cache, acs="latest" is first resolved to the concrete release id,
+    which keys the cache and is requested explicitly.
+    """
+    if isinstance(cache, str):
+        cache = ResponseCache(cache)
+    if cache is not None and acs == "latest" and geoids and table_ids:
+        acs = resolve_release(f"{base_url or CR_BASE}/{acs}", geoids[0], table_ids[0], request_timeout, cache=cache)
+    table_ids = list(dict.fromkeys(table_ids))
+    rows = {t: {} for t in table_ids}
+    failed = {}
+    if cache is not None:
+        for t in table_ids:
+            rows[t] = cache.get_many(acs, t, geoids)
+            failed[t] = cache.failed_batches(acs, t)
+    missing = {t: {g for g in geoids if g not in rows[t]} for t in table_ids}
+    plan = _plan_requests(geoids, table_ids, missing, failed, batch_size, tables_per_request)
+
+    n_failed = 0
+    def handle(tg, batch, got, err):
+        nonlocal n_failed
+        for t in tg:
+            if got is None:
+                if cache is not None:
+                    cache.mark_failed(acs, t, batch, repr(err))
+                continue
+            rows[t].update(got[t])
+            if cache is not None:
+                cache.put_many(acs, t, got[t])
+                cache.clear_failed(acs, t, batch)
+        n_failed += got is None
+
+    url = f"{base_url or CR_BASE}/{acs}"
+    if backend == "async":
+        asyncio.run(cr_async.run_batches(url, plan, handle, timeout=request_timeout, stats=stats, **async_options))
+    elif backend == "threads":
+        with requests.Session() as session:
+            session.headers.update({"User-Agent": "cr-batcher/1.0"})
+            with ThreadPoolExecutor(max_workers=max_workers) as pool:
+                futs = {pool.submit(_fetch_tables_batch, session, url, b, tg, request_timeout, stats=stats): (tg, b)
+                        for tg, b in plan}
+                for fut in as_completed(futs):
+                    handle(*futs[fut], *fut.result())
+    else:
+        raise ValueError(f"unknown fetch backend: {backend}")
+    if n_failed:
+        print(f"Warning: {n_failed} of {len(plan)} requests for {','.join(table_ids)} failed after retries; "
+              f"{'rerun to retry them' if cache is not None else 'their tracts are left empty'}")
+    return rows
+
 def fetch_cr_variable_for_tracts(
     df: pd.DataFrame,
     geoid_col: str,
@@ -60,62 +210,23 @@ def fetch_cr_variable_for_tracts(
     batch_size: int = 45,
     max_workers: int = 8,
     request_timeout: float = 15.0,
+    cache: Optional[Union[ResponseCache, str]] = None,
+    base_url: Optional[str] = None,
+    backend: str = "threads",
+    **fetch_options,
 ) -> pd.DataFrame:
-
-
-    def _normalize_geoid(g):
-        s = str(g)
-        if s.startswith("14000US"):
-            return s
-        if len(s) == 11 and s.isdigit():
-            return "14000US" + s
-        return s
-
-    def _chunked(seq, n):
-        chunk = []
-        for item in seq:
-            chunk.append(item)
-            if len(chunk) == n:
-                yield chunk
-                chunk = []
-        if chunk:
-            yield chunk
-
-    def _fetch_batch(session, geoids, table_id, col_id, acs, timeout=15.0, max_retries=3, backoff=0.8):
-        url = f"https://api.censusreporter.org/1.0/data/show/{acs}"
-        params = {"table_ids": table_id, "geo_ids": ",".join(geoids)}
-        last_exc = None
-        for attempt in range(max_retries):
-            try:
-                r = session.get(url, params=params, timeout=timeout)
-                if r.status_code in (429, 500, 502, 503, 504):
-                    raise requests.HTTPError(f"HTTP {r.status_code}", response=r)
-                r.raise_for_status()
-                j = r.json()
-                out = []
-                data = j.get("data", {})
-                for geoid in geoids:
-                    rec = data.get(geoid, {}).get(table_id, {})
-                    est = rec.get("estimate", {}).get(col_id, None)
-                    moe = rec.get("error", {}).get(col_id, None)
-                    out.append((geoid, est, moe))
-                return out
-            except (requests.Timeout, requests.ConnectionError, requests.HTTPError, json.JSONDecodeError):
-                # simple exponential backoff with slight growth
-                time.sleep((backoff ** attempt) * (1.0 + 0.25 * attempt))
-        return [(g, None, None) for g in geoids]
-
+    """
+    Estimate and MOE of one column for every tract in df[geoid_col].
+    Prefer fetch_cr_variables_for_tracts for several columns: it requests each table once.
+    backend="async" uses the rate-limited, adaptive-concurrency fetcher in cr_async.
+    """
     all_geoids = df[geoid_col].astype(str).map(_normalize_geoid)
     unique_geoids = list(pd.unique(all_geoids))
-    batches = list(_chunked(unique_geoids, batch_size))
+    rows = fetch_cr_tables(unique_geoids, [table_id], acs, batch_size, max_workers, request_timeout,
+                           cache=cache, base_url=base_url, backend=backend, **fetch_options)[table_id]
 
-    results = []
-    with requests.Session() as session:
-        session.headers.update({"User-Agent": "cr-batcher/1.0"})
-        with ThreadPoolExecutor(max_workers=max_workers) as pool:
-            futs = [pool.submit(_fetch_batch, session, b, table_id, col_id, acs, request_timeout) for b in batches]
-            for fut in as_completed(futs):
-                results.extend(fut.result())
+    results = [(g, rows[g].get("estimate", {}).get(col_id), rows[g].get("error", {}).get(col_id))
+               for g in unique_geoids if g in rows]
 
     # Build result DF and rename the right-side 'geoid' to the temp key
     res_df = pd.DataFrame(results, columns=["__geoid_norm", "estimate", "moe"])
@@ -128,35 +239,39 @@ def fetch_cr_variable_for_tracts(
     )
     return out
 
+def fetch_cr_variables_for_tracts(df, geoid_col, vars_dict, acs="latest", moe=False, batch_size=45,
+                                  max_workers=8, tables_per_request=5, cache=None, base_url=None,
+                                  backend="threads", **fetch_options):
+    """
+    Many ACS variables at once. Variables are grouped by table_id, each table
+    is downloaded once per geoid batch (several tables per request), and every
+    requested column is read from that one response.
+    vars_dict: {name: (table_id, col_id)}
+    moe: also return a "<var>_moe" column per variable (same responses, no extra requests)
+    Returns df[[geoid_col]] plus one "<table_id>_<last 3 digits>" column per variable, built in one pass.
+    """
+    vars_list = list(vars_dict.values())
+    all_geoids = df[geoid_col].astype(str).map(_normalize_geoid)
+    rows = fetch_cr_tables(list(pd.unique(all_geoids)), [t for t, _ in vars_list], acs, batch_size,
+                           max_workers, tables_per_request=tables_per_request, cache=cache, base_url=base_url,
+                           backend=backend, **fetch_options)
+    columns = {geoid_col: df[geoid_col].values}
+    for table_id, col_id in vars_list:
+        var_name = f"{table_id}_{col_id[-3:]}"  # e.g., B01003_001
+        recs = [rows[table_id].get(g, {}) for g in all_geoids]
+        columns[var_name] = [r.get("estimate", {}).get(col_id) for r in recs]
+        if moe:
+            columns[var_name + "_moe"] = [r.get("error", {}).get(col_id) for r in recs]
+    return pd.DataFrame(columns, index=df.index).astype({c: float for c in columns if c != geoid_col})
 
-def fetch_multiple_no_moe(df, geoid_col, vars_dict):
+def fetch_multiple_no_moe(df, geoid_col, vars_dict, cache=None, base_url=None):
     """
     Fetch multiple ACS variables from Census Reporter (estimates only).
     vars_list: list of (table_id, col_id)
+    cache: optional ResponseCache (or SQLite path) shared by all variables
     Returns df with one estimate column per variable.
     """
-    from functools import reduce
-
-    results = []
-    vars_list  = [vars_dict[key] for key in vars_dict.keys()] # extract features from var's dictionary
-    for table_id, col_id in vars_list:
-        out = fetch_cr_variable_for_tracts(
-            df=df,
-            geoid_col=geoid_col,
-            table_id=table_id,
-            col_id=col_id,
-            acs="latest",
-            batch_size=45,
-            max_workers=8
-        )
-
-        # Keep only GEOID + estimate; rename it cleanly
-        var_name = f"{table_id}_{col_id[-3:]}"  # e.g., B01003_001
-        out = out[[geoid_col, "estimate"]].rename(columns={"estimate": var_name})
-        results.append(out)
-
-    merged = reduce(lambda left, right: left.merge(right, on=geoid_col, how="left"), results)
-    return merged
+    return fetch_cr_variables_for_tracts(df, geoid_col, vars_dict, moe=False, cache=cache, base_url=base_url)
 
 def rename_cols(df, vars_dict):
     """
@@ -173,6 +288,9 @@ def rename_cols(df, vars_dict):
     norm = lambda c: str(c).upper().replace("_", "")  # turn 'b01003_001' -> 'B01003001'
 
     to_rename = {c: rev[norm(c)] for c in df.columns if norm(c) in rev}
+    # MOE columns from fetch_cr_variables_for_tracts(..., moe=True): 'B01003_001_moe' -> '<friendly> MOE'
+    to_rename.update({c: rev[norm(c)[:-3]] + " MOE" for c in df.columns
+                      if norm(c).endswith("MOE") and norm(c)[:-3] in rev})
     return df.rename(columns=to_rename)
 
 
@@ -216,21 +334,34 @@ Raw_Variables_Dictionary = {
     "60 or more minutes Travel Time to Work via Driving Alone" : ('B08134','B08134030')
 }
 
-# Uses only first 100 rows for testing purposes. (comment out when compiling final dataset)
-# df=df.head(100)
+if __name__ == "__main__":
+    # Dataset of ALL census tracts and some incorrectly named variables, used to compile on
+    df = pd.read_csv('Census_Reporter_API_calls/acs_tracts_2023_ioc_features.csv')
+    # print(df.head())
+
+    # print(df.columns) # cols in current df
+
+    df = df[['geoid', 'state_fips', 'county_fips', 'tract_code', 'NAME','pop_1plus']] # Keep only the useful columns (some names are wrong)
+    # print(df.head())
+
+    # Uses only first 100 rows for testing purposes. (comment out when compiling final dataset)
+    # df=df.head(100)
 
-# call the variables for the df
-raw_vars_df = fetch_multiple_no_moe(df, "geoid", Raw_Variables_Dictionary)
+    # call the variables for the df
+    # reruns only fetch tracts missing from the cache (and retry batches that failed last time)
+    cache = ResponseCache('Census_Reporter_API_calls/cr_cache.sqlite')
+    raw_vars_df = fetch_multiple_no_moe(df, "geoid", Raw_Variables_Dictionary, cache=cache)
+    print(cache.report())
 
-raw_vars_df = rename_cols(raw_vars_df, Raw_Variables_Dictionary)
+    raw_vars_df = rename_cols(raw_vars_df, Raw_Variables_Dictionary)
 
-merge_df = pd.merge(df, raw_vars_df, on='geoid', how='inner')
+    merge_df = pd.merge(df, raw_vars_df, on='geoid', how='inner')
 
-print('heading: \n', merge_df.head())
+    print('heading: \n', merge_df.head())
 
-print(merge_df.columns)
+    print(merge_df.columns)
 
-print(merge_df[['Total Travel Time to Work via Driving Alone',
-                'Total Travel Time to Work via Public transportation','Travel Time to Work Total']].head())
+    print(merge_df[['Total Travel Time to Work via Driving Alone',
+                    'Total Travel Time to Work via Public transportation','Travel Time to Work Total']].head())
 
-merge_df.to_csv('/workspaces/Urban-Ant/Census_Reporter_API_calls/RawData.csv', index = False)
+    merge_df.to_csv('/workspaces/Urban-Ant/Census_Reporter_API_calls/RawData.csv', index = False)
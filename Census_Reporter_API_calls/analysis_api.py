@@ -0,0 +1,459 @@
+import gzip
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+import pandas as pd
+from Stop_Tract_Join import ROUTE_TYPES, read_tracts
+from UA_Tract_Info import _normalize_geoid
+
+'''
+---------------------------------------------------------------------------------------------------------------------
+Local backend for the frontend (frontend/src/services/analysisApi.js, http://localhost:8000/api).
+`build` precomputes everything once from the tract frame (Transformed_Data.csv merged with the stop service
+columns of Stop_Tract_Join.py) and the tract polygons:
+- metrics / trends / distribution for 'all', each census region and each state (aggregates.json); "trends" is
+  the day-of-week profile of frequent service, as the stop data covers a single service week,
+- a transit-gap layer as GeoJSON tiles per zoom level, snapped to each zoom's pixel grid (tiles.sqlite); a tract
+  is stored whole in each of the (at most 2x2) tiles it touches, or clipped per tile when it spans more.
+`serve` only looks responses up: bodies are pre-encoded (gzip, and plain for the aggregates) with strong ETags,
+so a request never scans the dataset and a revalidation is a 304 without a body.
+  python Census_Reporter_API_calls/analysis_api.py build Tract_Service.csv tracts.geojsonl [cache_dir]
+  python Census_Reporter_API_calls/analysis_api.py serve [cache_dir] [port]
+Gap score per tract: percentile of population density minus percentile of weekday departures per resident,
+in [-1, 1]; positive means denser than it is served.
+---------------------------------------------------------------------------------------------------------------------
+'''
+
+CACHE_DIR = "Census_Reporter_API_calls/api_cache"
+TILE_SIZE = 256              # pixels per tile edge; geometry is snapped to a quarter pixel
+FREQUENT_DAILY = 64          # weekday departures from a tract's stops, ~4 per hour over 16 hours
+DOW_LABELS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]   # departures_dow1..7
+POP_COLUMNS = ["pop_1plus", "Travel Time to Work Total"]   # first present is used as population
+
+STATE_REGIONS = {
+    "northeast": ["09", "23", "25", "33", "34", "36", "42", "44", "50"],
+    "midwest": ["17", "18", "19", "20", "26", "27", "29", "31", "38", "39", "46", "55"],
+    "south": ["01", "05", "10", "11", "12", "13", "21", "22", "24", "28", "37", "40", "45", "47", "48", "51", "54"],
+    "west": ["02", "04", "06", "08", "15", "16", "30", "32", "35", "41", "49", "53", "56"],
+}
+# donut chart groups of GTFS route types
+VEHICLE_GROUPS = {"Bus": ["bus", "trolleybus"], "Rail": ["subway", "rail", "monorail"],
+                  "Light Rail": ["tram", "cable_tram"], "Ferry": ["ferry"], "Other": ["aerial_lift", "funicular"]}
+
+# ---------------------------------------
+# Tract table and aggregates
+# ---------------------------------------
+def _ring_area_km2(ring):
+    """Signed shoelace area of a lon/lat ring, scaled by cos(latitude) to km²."""
+    lon, lat = ring[:, 0], ring[:, 1]
+    k = 111.32 ** 2 * math.cos(math.radians(float(lat.mean())))
+    return 0.5 * k * float(np.dot(lon, np.roll(lat, -1)) - np.dot(lat, np.roll(lon, -1)))
+
+def tract_table(frame: pd.DataFrame, areas: Dict[str, float]) -> pd.DataFrame:
+    """
+    One row per tract with the columns the aggregates and tiles need:
+    pop, area_km2, density, stop service (0 where the frame has none), gap.
+    """
+    df = pd.DataFrame({"geoid": frame["geoid"].astype(str).map(_normalize_geoid).values})
+    pop_col = next((c for c in POP_COLUMNS if c in frame), None)
+    df["pop"] = pd.to_numeric(frame[pop_col], errors="coerce").fillna(0).values if pop_col else 0.0
+    num = lambda c: pd.to_numeric(frame[c], errors="coerce").fillna(0).values if c in frame else 0.0
+    for c in ["n_stops", "departures_week"] + [f"departures_dow{d}" for d in range(1, 8)] \
+            + [f"routes_{name}" for name in ROUTE_TYPES.values()]:
+        df[c] = num(c)
+    for c in ["avg_minutes_pt", "avg_minutes_drive"]:
+        df[c] = pd.to_numeric(frame[c], errors="coerce").values if c in frame else np.nan
+    df["area_km2"] = df["geoid"].map(areas).astype(float)
+    df["weekday_departures"] = df[[f"departures_dow{d}" for d in range(1, 6)]].mean(axis=1)
+    df["density"] = df["pop"] / df["area_km2"].where(df["area_km2"] > 0)
+    per_resident = df["weekday_departures"] / df["pop"].where(df["pop"] > 0)
+    df["gap"] = df["density"].rank(pct=True).fillna(0) - per_resident.fillna(0).rank(pct=True)
+    df["state"] = df["geoid"].str.replace("14000US", "", regex=False).str[:2]
+    return df
+
+def _pct(x):
+    return f"{x:.0%}" if np.isfinite(x) else "n/a"
+
+def _people(x):
+    return f"{x / 1e6:.1f}M" if x >= 1e6 else f"{x / 1e3:.0f}k" if x >= 1e3 else f"{x:.0f}"
+
+def _weighted_ratio(w, num, den):
+    ok = np.isfinite(num) & np.isfinite(den) & (w > 0)
+    return float(np.average(num[ok], weights=w[ok]) / np.average(den[ok], weights=w[ok])) if ok.any() else np.nan
+
+def _metric_values(t: pd.DataFrame) -> Dict[str, float]:
+    pop, area = t["pop"].to_numpy(), t["area_km2"].fillna(0).to_numpy()
+    served = t["n_stops"].to_numpy() > 0
+    total_pop = pop.sum()
+    return {
+        "accessibility": pop[t["weekday_departures"].to_numpy() >= FREQUENT_DAILY].sum() / total_pop
+                         if total_pop else np.nan,
+        "coverage": area[served].sum() / area.sum() if area.sum() else np.nan,
+        "impact": float(pop[served].sum()),
+        "efficiency": _weighted_ratio(pop, t["avg_minutes_drive"].to_numpy(), t["avg_minutes_pt"].to_numpy()),
+    }
+
+def metrics_payload(t: pd.DataFrame, national: Optional[Dict[str, float]] = None) -> dict:
+    """MetricCard values; regions carry a trend relative to the national figure."""
+    v = _metric_values(t)
+    out = {}
+    for key, val in v.items():
+        text = _people(val) if key == "impact" else _pct(val)
+        trend = None
+        if national is not None and np.isfinite(val) and np.isfinite(national[key]):
+            if key == "impact":
+                trend = {"direction": "up", "value": f"{val / national[key]:.0%} of national residents served"
+                         if national[key] else "n/a"}
+            else:
+                diff = (val - national[key]) * 100
+                trend = {"direction": "up" if diff >= 0 else "down", "value": f"{diff:+.0f} pts vs national"}
+        out[key] = {"value": text, "raw": None if not np.isfinite(val) else float(val), "trend": trend}
+    return out
+
+def trends_payload(t: pd.DataFrame) -> dict:
+    """
+    Day-of-week profile (not a time series): share of residents with frequent
+    service on each day of the GTFS service week.
+    """
+    pop = t["pop"].to_numpy()
+    total = pop.sum() or 1.0
+    return {"kind": "day_of_week",
+            "data": [{"day": day, "value": round(100 * pop[t[f"departures_dow{d}"].to_numpy() >= FREQUENT_DAILY].sum() / total, 1)}
+                     for d, day in enumerate(DOW_LABELS, start=1)]}
+
+def distribution_payload(t: pd.DataFrame) -> dict:
+    """Residents of tracts served by each vehicle group."""
+    pop = t["pop"].to_numpy()
+    data = []
+    for label, names in VEHICLE_GROUPS.items():
+        served = np.zeros(len(t), dtype=bool)
+        for name in names:
+            served |= t[f"routes_{name}"].to_numpy() > 0
+        data.append({"label": label, "value": int(pop[served].sum())})
+    return {"data": data}
+
+def build_aggregates(t: pd.DataFrame) -> dict:
+    """{endpoint: {region: payload}} for 'all', the four census regions and every state FIPS present."""
+    groups = {"all": t}
+    for region, states in STATE_REGIONS.items():
+        groups[region] = t[t["state"].isin(states)]
+    for state, sub in t.groupby("state"):
+        groups[state] = sub
+    national = _metric_values(t)
+    out = {"metrics": {}, "trends": {}, "distribution": {}}
+    for region, sub in groups.items():
+        out["metrics"][region] = metrics_payload(sub, None if region == "all" else national)
+        out["trends"][region] = trends_payload(sub)
+        out["distribution"][region] = distribution_payload(sub)
+    return out
+
+# ---------------------------------------
+# Tiles (web mercator z/x/y)
+# ---------------------------------------
+def lonlat_to_pixel(lonlat: np.ndarray, z: int) -> np.ndarray:
+    n = TILE_SIZE * 2 ** z
+    lat = np.radians(np.clip(lonlat[:, 1], -85.0511, 85.0511))
+    return np.stack([(lonlat[:, 0] + 180.0) / 360.0 * n,
+                     (1.0 - np.log(np.tan(lat) + 1.0 / np.cos(lat)) / math.pi) / 2.0 * n], axis=1)
+
+def pixel_to_lonlat(px: np.ndarray, z: int) -> np.ndarray:
+    n = TILE_SIZE * 2 ** z
+    return np.stack([px[:, 0] / n * 360.0 - 180.0,
+                     np.degrees(np.arctan(np.sinh(math.pi * (1.0 - 2.0 * px[:, 1] / n))))], axis=1)
+
+def _clip_side(p, axis, bound, keep_above):
+    """One Sutherland-Hodgman pass of an open ring against an axis-aligned line."""
+    inside = p[:, axis] >= bound if keep_above else p[:, axis] <= bound
+    q = np.roll(p, -1, axis=0)
+    cross = inside != np.roll(inside, -1)
+    d = q[:, axis] - p[:, axis]
+    t = np.where(cross, (bound - p[:, axis]) / np.where(cross, d, 1.0), 0.0)
+    hit = p + t[:, None] * (q - p)
+    return np.stack([p, hit], axis=1).reshape(-1, 2)[np.stack([inside, cross], axis=1).ravel()]
+
+def clip_ring(p, x0, y0, x1, y1):
+    for axis, bound, above in ((0, x0, True), (0, x1, False), (1, y0, True), (1, y1, False)):
+        if len(p) < 3:
+            break
+        p = _clip_side(p, axis, bound, above)
+    return p
+
+def _snap(p):
+    """Quarter-pixel grid without repeated points; None if nothing of the ring is left."""
+    p = np.round(p * 4) / 4
+    keep = np.any(p != np.roll(p, 1, axis=0), axis=1)
+    p = p[keep] if keep.any() else p[:1]
+    return p if len(p) >= 3 else None
+
+def _geometry_json(rings_px, z):
+    coords = []
+    for p in rings_px:
+        ll = np.round(pixel_to_lonlat(np.vstack([p, p[:1]]), z), 6)
+        coords.append(ll.tolist())
+    # all rings in one Polygon: Leaflet fills with the even-odd rule, which handles holes and parts alike
+    return json.dumps({"type": "Polygon", "coordinates": coords}, separators=(",", ":"))
+
+def _clipped_tiles(px: List[np.ndarray], tx0, ty0, tx1, ty1, z: int):
+    """((x, y), geometry json) of a tract spanning many tiles, clipped to each tile."""
+    for tx in range(tx0, tx1 + 1):
+        for ty in range(ty0, ty1 + 1):
+            box = (tx * TILE_SIZE, ty * TILE_SIZE, (tx + 1) * TILE_SIZE, (ty + 1) * TILE_SIZE)
+            parts = []
+            for p in px:
+                if p[:, 0].max() < box[0] or p[:, 0].min() > box[2] or p[:, 1].max() < box[1] or p[:, 1].min() > box[3]:
+                    continue
+                s = _snap(clip_ring(p, *box))
+                if s is not None:
+                    parts.append(s)
+            if parts:
+                yield (tx, ty), _geometry_json(parts, z)
+
+class TractRings:
+    """All tract rings as one open-ring vertex array (tract by tract), so a zoom level projects in one call."""
+    def __init__(self, rings_per_tract: List[List[np.ndarray]]):
+        open_rings = [[r[:-1] if len(r) > 3 and np.array_equal(r[0], r[-1]) else r for r in rings]
+                      for rings in rings_per_tract]
+        lengths = [len(r) for rings in open_rings for r in rings]
+        self.vertices = np.concatenate([r for rings in open_rings for r in rings])
+        self.ring_ptr = np.concatenate([[0], np.cumsum(lengths)])
+        self.tract_ring_ptr = np.concatenate([[0], np.cumsum([len(rings) for rings in open_rings])])
+        self.tract_ptr = self.ring_ptr[self.tract_ring_ptr]
+
+    def __len__(self):
+        return len(self.tract_ptr) - 1
+
+    def tiles(self, z: int):
+        """
+        Yield (tract, (x, y), geometry json, clipped) for every tile at zoom z
+        a tract touches. Tracts under a pixel are left out. Tracts touching at
+        most 2x2 tiles go whole into each, snapped for all vertices at once
+        (clients draw each geoid once); larger ones are clipped tile by tile.
+        """
+        p = lonlat_to_pixel(self.vertices, z)
+        lo = np.minimum.reduceat(p, self.tract_ptr[:-1])
+        hi = np.maximum.reduceat(p, self.tract_ptr[:-1])
+        t0 = (lo // TILE_SIZE).astype(np.int64)
+        t1 = (hi // TILE_SIZE).astype(np.int64)
+        visible = (hi - lo).max(axis=1) >= 1.0
+        whole = visible & (t1 - t0 <= 1).all(axis=1)
+
+        # snap every vertex, drop repeats of the previous vertex of the same ring
+        q = np.round(p * 4) / 4
+        ring_of = np.repeat(np.arange(len(self.ring_ptr) - 1), np.diff(self.ring_ptr))
+        prev = np.arange(len(q)) - 1
+        starts = self.ring_ptr[:-1]
+        prev[starts] = self.ring_ptr[1:] - 1
+        keep = np.any(q != q[prev], axis=1)
+        kept_ptr = np.concatenate([[0], np.cumsum(np.bincount(ring_of[keep], minlength=len(starts)))])
+        ll = np.round(pixel_to_lonlat(q[keep], z), 6).tolist()
+
+        for i in np.flatnonzero(whole):
+            coords = []
+            for r in range(self.tract_ring_ptr[i], self.tract_ring_ptr[i + 1]):
+                ring = ll[kept_ptr[r]:kept_ptr[r + 1]]
+                if len(ring) >= 3:
+                    coords.append(ring + ring[:1])
+            if coords:
+                # all rings in one Polygon: Leaflet fills with the even-odd rule, which handles holes and parts alike
+                geom = json.dumps({"type": "Polygon", "coordinates": coords}, separators=(",", ":"))
+                for tx in range(t0[i, 0], t1[i, 0] + 1):
+                    for ty in range(t0[i, 1], t1[i, 1] + 1):
+                        yield i, (int(tx), int(ty)), geom, False
+        for i in np.flatnonzero(visible & ~whole):
+            px = [p[self.ring_ptr[r]:self.ring_ptr[r + 1]] for r in range(self.tract_ring_ptr[i], self.tract_ring_ptr[i + 1])]
+            for key, geom in _clipped_tiles(px, t0[i, 0], t0[i, 1], t1[i, 0], t1[i, 1], z):
+                yield i, (int(key[0]), int(key[1])), geom, True
+
+def _properties_json(row) -> str:
+    num = lambda v, nd: None if not np.isfinite(v) else round(float(v), nd)
+    return json.dumps({"geoid": row.geoid, "gap": num(row.gap, 3), "pop": int(row.pop), "n_stops": int(row.n_stops),
+                       "weekday_departures": num(row.weekday_departures, 1),
+                       "density": num(row.density, 1), "avg_minutes_pt": num(row.avg_minutes_pt, 1)},
+                      separators=(",", ":"))
+
+def _encode(obj_bytes: bytes) -> Tuple[bytes, bytes, str]:
+    """(plain, gzip, strong ETag) for a response body."""
+    return obj_bytes, gzip.compress(obj_bytes, 6, mtime=0), '"' + hashlib.blake2b(obj_bytes, digest_size=12).hexdigest() + '"'
+
+def build_cache(frame_path: str, tracts_path: str, cache_dir: str = CACHE_DIR, zooms=range(8, 13),
+                geoid_prop: str = "GEOID") -> dict:
+    """Precompute aggregates.json and tiles.sqlite in cache_dir; returns the tiles metadata."""
+    t0 = time.perf_counter()
+    geoms = {}
+    for g, rings in read_tracts(tracts_path, geoid_prop):
+        if rings:
+            geoms[_normalize_geoid(g)] = rings
+    areas = {g: abs(sum(_ring_area_km2(r) for r in rings)) for g, rings in geoms.items()}
+    t = tract_table(pd.read_csv(frame_path, dtype={"geoid": str}), areas)
+
+    os.makedirs(cache_dir, exist_ok=True)
+    aggregates = build_aggregates(t)
+    with open(os.path.join(cache_dir, "aggregates.json"), "w") as f:
+        json.dump(aggregates, f)
+
+    path = os.path.join(cache_dir, "tiles.sqlite")
+    if os.path.exists(path):
+        os.remove(path)
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE tiles (z INTEGER, x INTEGER, y INTEGER, data BLOB, etag TEXT, PRIMARY KEY (z, x, y));
+        CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+    """)
+    rows = [r for r in t.itertuples(index=False) if r.geoid in geoms]
+    props = [_properties_json(r) for r in rows]
+    shapes = TractRings([geoms[r.geoid] for r in rows])
+    n_tiles = 0
+    for z in zooms:
+        tiles: Dict[Tuple[int, int], List[str]] = {}
+        for i, key, geom, clipped in shapes.tiles(z):
+            prop = props[i][:-1] + ',"clipped":true}' if clipped else props[i]
+            tiles.setdefault(key, []).append(f'{{"type":"Feature","geometry":{geom},"properties":{prop}}}')
+        records = []
+        for (x, y), feats in tiles.items():
+            _, gz, etag = _encode(('{"type":"FeatureCollection","features":[' + ",".join(feats) + "]}").encode())
+            records.append((z, int(x), int(y), gz, etag))   # stored gzipped only; the server inflates for the rare plain client
+        with conn:
+            conn.executemany("INSERT INTO tiles VALUES (?, ?, ?, ?, ?)", records)
+        n_tiles += len(tiles)
+    allp = shapes.vertices
+    meta = {"minzoom": min(zooms), "maxzoom": max(zooms), "tile_size": TILE_SIZE,
+            "bounds": [*allp.min(axis=0).round(6).tolist(), *allp.max(axis=0).round(6).tolist()],
+            "gap_range": [-1, 1], "tiles": n_tiles, "tracts": len(rows)}
+    with conn:
+        conn.execute("INSERT INTO meta VALUES ('tilejson', ?)", (json.dumps(meta),))
+    conn.close()
+    print(f"built {len(aggregates['metrics'])} regions and {n_tiles:,} tiles for {len(rows):,} tracts "
+          f"in {time.perf_counter() - t0:.1f}s -> {cache_dir}")
+    return meta
+
+# ---------------------------------------
+# Server
+# ---------------------------------------
+class ResponseStore:
+    """
+    Pre-encoded responses: aggregates are all held in memory, tiles are read
+    from tiles.sqlite by primary key and kept in an LRU of `tile_cache` entries.
+    """
+    def __init__(self, cache_dir: str = CACHE_DIR, tile_cache: int = 4096):
+        with open(os.path.join(cache_dir, "aggregates.json")) as f:
+            aggregates = json.load(f)
+        self.static = {}
+        for endpoint, by_region in aggregates.items():
+            for region, payload in by_region.items():
+                self.static[(endpoint, region)] = _encode(json.dumps(payload, separators=(",", ":")).encode())
+        self.tiles_path = os.path.join(cache_dir, "tiles.sqlite")
+        self.local = threading.local()
+        meta = self._conn().execute("SELECT value FROM meta WHERE key='tilejson'").fetchone()
+        self.static[("tiles.json", "all")] = _encode(meta[0].encode())
+        self.empty_tile = _encode(b'{"type":"FeatureCollection","features":[]}')
+        self.lru, self.lru_size, self.lock = OrderedDict(), tile_cache, threading.Lock()
+
+    def _conn(self):
+        if not hasattr(self.local, "conn"):
+            self.local.conn = sqlite3.connect(f"file:{self.tiles_path}?mode=ro", uri=True)
+        return self.local.conn
+
+    def tile(self, z, x, y):
+        key = (z, x, y)
+        with self.lock:
+            if key in self.lru:
+                self.lru.move_to_end(key)
+                return self.lru[key]
+        row = self._conn().execute("SELECT data, etag FROM tiles WHERE z=? AND x=? AND y=?", key).fetchone()
+        resp = (None, row[0], row[1]) if row else self.empty_tile
+        with self.lock:
+            self.lru[key] = resp
+            if len(self.lru) > self.lru_size:
+                self.lru.popitem(last=False)
+        return resp
+
+def make_handler(store: ResponseStore):
+    class AnalysisHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"   # keep-alive, so clients do not reconnect per request
+        disable_nagle_algorithm = True  # headers and body go out as separate writes; don't hold the body back
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            parts = url.path.strip("/").split("/")
+            if parts[:1] != ["api"] or len(parts) < 2:
+                return self._send(404, b'{"error":"not found"}')
+            region = parse_qs(url.query).get("region", ["all"])[0].lower()
+            if parts[1] == "tiles" and len(parts) == 5 and parts[4].endswith(".json"):
+                try:
+                    z, x, y = int(parts[2]), int(parts[3]), int(parts[4][:-5])
+                except ValueError:
+                    return self._send(400, b'{"error":"bad tile address"}')
+                return self._send_cached(store.tile(z, x, y), "public, max-age=86400")
+            if parts[1] == "health":
+                return self._send(200, b'{"status":"ok"}')
+            endpoint = {"metrics": "metrics", "trends": "trends", "distribution": "distribution",
+                        "tiles.json": "tiles.json"}.get(parts[1])
+            resp = store.static.get((endpoint, "all" if endpoint == "tiles.json" else region))
+            if resp is None:
+                return self._send(404, json.dumps({"error": f"unknown endpoint or region: {url.path} {region}"}).encode())
+            self._send_cached(resp, "public, max-age=300")
+
+        def do_OPTIONS(self):
+            self._send(204, b"")
+
+        def _send_cached(self, resp, cache_control):
+            plain, gz, etag = resp
+            headers = {"ETag": etag, "Cache-Control": cache_control, "Vary": "Accept-Encoding"}
+            if etag in [t.strip() for t in self.headers.get("If-None-Match", "").split(",")]:
+                return self._send(304, b"", headers)
+            if "gzip" in self.headers.get("Accept-Encoding", ""):
+                headers["Content-Encoding"] = "gzip"
+                return self._send(200, gz, headers)
+            self._send(200, plain if plain is not None else gzip.decompress(gz), headers)
+
+        def _send(self, status, body, headers=None):
+            self.send_response(status)
+            self.send_header("Access-Control-Allow-Origin", "*")
+            self.send_header("Access-Control-Allow-Headers", "If-None-Match")
+            self.send_header("Access-Control-Expose-Headers", "ETag")
+            if status != 304:
+                self.send_header("Content-Type", "application/json")
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    return AnalysisHandler
+
+class AnalysisServer(ThreadingHTTPServer):
+    request_queue_size = 256
+    daemon_threads = True
+
+def serve(cache_dir: str = CACHE_DIR, port: int = 8000, host: str = "127.0.0.1"):
+    """Start the API in a daemon thread; returns (server, base_url). Stop with server.shutdown()."""
+    server = AnalysisServer((host, port), make_handler(ResponseStore(cache_dir)))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}/api"
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "build":
+        build_cache(sys.argv[2], sys.argv[3], sys.argv[4] if len(sys.argv) > 4 else CACHE_DIR)
+    else:
+        cache_dir = sys.argv[2] if len(sys.argv) > 2 else CACHE_DIR
+        port = int(sys.argv[3]) if len(sys.argv) > 3 else 8000
+        server, base_url = serve(cache_dir, port)
+        print(f"Serving analysis API at {base_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.shutdown()
@@ -0,0 +1,123 @@
+import http.client
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+import numpy as np
+import pandas as pd
+import analysis_api
+from cr_async import FetchStats
+
+'''
+---------------------------------------------------------------------------------------------------------------------
+Load test of the analysis API: builds a cache from synthetic tracts (or the given frame and tract files), runs the
+server in its own process and measures latency percentiles as concurrent keep-alive clients pan the map (tiles
+around a random spot) and refresh the dashboard (metrics/trends/distribution). A share of requests revalidate
+with If-None-Match, as a browser does.
+  python Census_Reporter_API_calls/bench_api.py [seconds_per_level] [frame.csv tracts.geojsonl]
+---------------------------------------------------------------------------------------------------------------------
+'''
+
+def synthetic_inputs(out_dir, n_side=120, seed=0):
+    """A jittered n_side x n_side lattice of tracts around Austin, TX plus a frame with service columns."""
+    rng = np.random.default_rng(seed)
+    step = 0.6 / n_side
+    xs, ys = -98.0 + np.arange(n_side + 1) * step, 30.0 + np.arange(n_side + 1) * step
+    v = np.stack(np.meshgrid(xs, ys), -1) + rng.uniform(-0.3, 0.3, (n_side + 1, n_side + 1, 2)) * step
+    geoids, tracts_path = [], os.path.join(out_dir, "tracts.geojsonl")
+    with open(tracts_path, "w") as f:
+        for j in range(n_side):
+            for i in range(n_side):
+                ring = [v[j, i], v[j, i + 1], v[j + 1, i + 1], v[j + 1, i], v[j, i]]
+                geoid = f"48453{len(geoids):06d}"
+                geoids.append(geoid)
+                f.write(json.dumps({"type": "Feature", "properties": {"GEOID": geoid},
+                                    "geometry": {"type": "Polygon", "coordinates": [[list(p) for p in ring]]}}) + "\n")
+    n = len(geoids)
+    frame = pd.DataFrame({"geoid": ["14000US" + g for g in geoids], "pop_1plus": rng.integers(500, 8000, n),
+                          "avg_minutes_pt": rng.uniform(25, 70, n), "avg_minutes_drive": rng.uniform(15, 40, n),
+                          "n_stops": rng.poisson(3, n), "routes_bus": rng.poisson(2, n), "routes_tram": rng.poisson(0.1, n)})
+    for d in range(1, 8):
+        frame[f"departures_dow{d}"] = frame["n_stops"] * rng.integers(0, 60, n) * (0.5 if d > 5 else 1.0)
+    frame_path = os.path.join(out_dir, "frame.csv")
+    frame.to_csv(frame_path, index=False)
+    return frame_path, tracts_path
+
+def _serve_forever(cache_dir, ready):
+    server, _ = analysis_api.serve(cache_dir, 0)
+    ready.put(server.server_address[1])
+    threading.Event().wait()
+
+def serve_in_process(cache_dir):
+    """Server in its own process so its CPU time does not share the GIL with the clients; returns (process, port)."""
+    import multiprocessing as mp
+    ready = mp.Queue()
+    proc = mp.Process(target=_serve_forever, args=(cache_dir, ready), daemon=True)
+    proc.start()
+    return proc, ready.get(timeout=60)
+
+def client(port, tiles, regions, seconds, stats, seed, revalidate=0.3):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=10)
+    etags = {}
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        if rng.random() < 0.2:
+            path = f"/api/{rng.choice(['metrics', 'trends', 'distribution'])}?region={rng.choice(regions)}"
+            paths = [path]
+        else:   # a pan: the tiles of a 3x3 viewport around a random tile
+            z, x, y = rng.choice(tiles)
+            paths = [f"/api/tiles/{z}/{x + dx}/{y + dy}.json" for dx in (-1, 0, 1) for dy in (-1, 0, 1)]
+        for path in paths:
+            headers = {"Accept-Encoding": "gzip"}
+            if path in etags and rng.random() < revalidate:
+                headers["If-None-Match"] = etags[path]
+            t0 = time.perf_counter()
+            conn.request("GET", path, headers=headers)
+            r = conn.getresponse()
+            r.read()
+            stats.record(time.perf_counter() - t0, r.status)
+            if r.getheader("ETag"):
+                etags[path] = r.getheader("ETag")
+    conn.close()
+
+def bench(seconds=5.0, frame_path=None, tracts_path=None, levels=(1, 8, 32, 64)):
+    with tempfile.TemporaryDirectory() as tmp:
+        if frame_path is None:
+            frame_path, tracts_path = synthetic_inputs(tmp)
+        cache_dir = os.path.join(tmp, "api_cache")
+        analysis_api.build_cache(frame_path, tracts_path, cache_dir)
+        conn = sqlite3.connect(os.path.join(cache_dir, "tiles.sqlite"))
+        tiles = conn.execute("SELECT z, x, y FROM tiles").fetchall()
+        conn.close()
+        with open(os.path.join(cache_dir, "aggregates.json")) as f:
+            regions = list(json.load(f)["metrics"])
+
+        proc, port = serve_in_process(cache_dir)
+        try:
+            for n_clients in levels:
+                stats = FetchStats()
+                threads = [threading.Thread(target=client, args=(port, tiles, regions, seconds, stats, i))
+                           for i in range(n_clients)]
+                for t in threads:
+                    t.start()
+                for t in threads:
+                    t.join()
+                s = stats.summary()
+                not_modified = sum(1 for st in stats.statuses if st == 304)
+                print(f"{n_clients:3d} clients | {s['requests']:6d} requests, {s['req_per_s']:7.0f} req/s | "
+                      f"p50 {s['p50_ms']:6.2f} ms  p95 {s['p95_ms']:6.2f} ms  p99 {s['p99_ms']:6.2f} ms | "
+                      f"{not_modified / max(s['requests'], 1):.0%} 304")
+        finally:
+            proc.terminate()
+
+if __name__ == "__main__":
+    secs = float(sys.argv[1]) if len(sys.argv) > 1 else 5.0
+    if len(sys.argv) > 3:
+        bench(secs, sys.argv[2], sys.argv[3])
+    else:
+        bench(secs)
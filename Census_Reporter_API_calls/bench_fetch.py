@@ -0,0 +1,40 @@
+import sys
+import time
+import pandas as pd
+import cr_stub_server
+from cr_async import FetchStats
+from UA_Tract_Info import fetch_cr_variables_for_tracts, Raw_Variables_Dictionary
+
+'''
+---------------------------------------------------------------------------------------------------------------------
+Offline benchmark of the thread and async fetch backends against the local stub server,
+with injected latency and a server-side rate limit (429 + Retry-After past max_rps).
+  python Census_Reporter_API_calls/bench_fetch.py [n_tracts] [max_rps] [latency_ms]
+---------------------------------------------------------------------------------------------------------------------
+'''
+
+def bench(n_tracts=4000, max_rps=150.0, latency_ms=60.0, jitter_ms=120.0):
+    df = pd.DataFrame({"geoid": [f"{48000000000 + i}" for i in range(n_tracts)]})
+    runs = [
+        ("threads (8 workers)", dict(backend="threads", max_workers=8)),
+        ("threads (32 workers)", dict(backend="threads", max_workers=32)),
+        ("async (AIMD, bucket at 90% of limit)", dict(backend="async", rate=0.9 * max_rps, max_concurrency=64)),
+        ("async (AIMD only, bucket at 3x limit)", dict(backend="async", rate=3 * max_rps, max_concurrency=64)),
+    ]
+    for name, opts in runs:
+        server, base_url = cr_stub_server.serve_in_process(latency_ms=latency_ms, jitter_ms=jitter_ms,
+                                                           max_rps=max_rps)
+        stats = FetchStats()
+        t0 = time.perf_counter()
+        out = fetch_cr_variables_for_tracts(df, "geoid", Raw_Variables_Dictionary, base_url=base_url,
+                                            stats=stats, **opts)
+        wall = time.perf_counter() - t0
+        missing = int(out.drop(columns="geoid").isna().any(axis=1).sum())
+        print(f"{name:38s} {wall:6.1f}s wall | {stats.report()} | {missing} tracts incomplete")
+        server.terminate()
+
+if __name__ == "__main__":
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 4000
+    rps = float(sys.argv[2]) if len(sys.argv) > 2 else 150.0
+    lat = float(sys.argv[3]) if len(sys.argv) > 3 else 60.0
+    bench(n, rps, lat)
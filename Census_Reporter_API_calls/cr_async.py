@@ -0,0 +1,218 @@
+import asyncio
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Optional, Tuple
+
+import numpy as np
+import requests
+
+try:
+    import aiohttp  # optional; without it requests run on worker threads under the same async control
+except ImportError:
+    aiohttp = None
+
+'''
+---------------------------------------------------------------------------------------------------------------------
+Async fetch backend for the Census Reporter batches:
+- a token bucket caps the request rate,
+- an AIMD limiter adapts concurrency and that rate (slow additive growth, halve on 429/5xx),
+- retries use full-jitter exponential backoff and honour Retry-After,
+- each batch is handed to `on_result` as soon as it completes.
+---------------------------------------------------------------------------------------------------------------------
+'''
+
+THROTTLE_STATUSES = (429, 500, 502, 503, 504)
+# failures worth a retry: timeouts, connection and payload errors of either HTTP client, bad JSON
+RETRY_ERRORS = (asyncio.TimeoutError, OSError, requests.RequestException, ValueError) + \
+    ((aiohttp.ClientError,) if aiohttp is not None else ())
+
+class TokenBucket:
+    """At most `rate` requests/sec on average, with bursts of up to `burst`."""
+    def __init__(self, rate: float, burst: Optional[float] = None):
+        self.rate = rate
+        self.capacity = burst if burst is not None else max(rate, 1.0)
+        self.tokens = self.capacity
+        self.stamp = time.monotonic()
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.rate)
+                self.stamp = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+class AIMDLimiter:
+    """
+    Concurrency limit that grows by `increase` per window of successful
+    requests (about +1 per round trip) and is multiplied by `decrease` on a
+    throttling response, at most once per `cooldown` seconds so one burst of
+    429s counts as a single congestion signal. With a `bucket`, its rate
+    follows the same rule (about +1 req/s per second, cut on throttling),
+    so the limiter also finds a server's rate limit that is not known upfront.
+    """
+    def __init__(self, initial=8, minimum=1, maximum=64, increase=1.0, decrease=0.5, cooldown=1.0,
+                 bucket=None, min_rate=0.5):
+        self.bucket, self.min_rate = bucket, min_rate
+        self.max_rate = bucket.rate if bucket is not None else None
+        self.limit = float(initial)
+        self.minimum, self.maximum = minimum, maximum
+        self.increase, self.decrease, self.cooldown = increase, decrease, cooldown
+        self.in_flight = 0
+        self.last_cut = float("-inf")
+        self.cond = asyncio.Condition()
+        self.history = [(time.monotonic(), self.limit)]
+
+    async def acquire(self):
+        async with self.cond:
+            await self.cond.wait_for(lambda: self.in_flight < int(self.limit))
+            self.in_flight += 1
+
+    async def release(self, throttled: bool):
+        async with self.cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if throttled:
+                if now - self.last_cut >= self.cooldown:
+                    self.limit = max(self.minimum, self.limit * self.decrease)
+                    if self.bucket is not None:
+                        self.bucket.rate = max(self.min_rate, self.bucket.rate * self.decrease)
+                    self.last_cut = now
+            else:
+                self.limit = min(self.maximum, self.limit + self.increase / self.limit)
+                if self.bucket is not None:
+                    self.bucket.rate = min(self.max_rate, self.bucket.rate + self.increase / self.bucket.rate)
+            self.history.append((now, self.limit))
+            self.cond.notify_all()
+
+class FetchStats:
+    """Per-request latencies and outcomes; shared by the thread and async backends."""
+    def __init__(self):
+        self.latencies, self.statuses = [], []
+        self.start = time.perf_counter()
+        self.lock = threading.Lock()
+
+    def record(self, latency: float, status: int):
+        with self.lock:
+            self.latencies.append(latency)
+            self.statuses.append(status)
+
+    def summary(self) -> dict:
+        elapsed = time.perf_counter() - self.start
+        lat = np.array(self.latencies) * 1e3 if self.latencies else np.zeros(1)
+        st = np.array(self.statuses)
+        return {
+            "requests": len(self.statuses), "elapsed_s": elapsed,
+            "req_per_s": len(self.statuses) / elapsed if elapsed else 0.0,
+            "throttled": int(np.isin(st, THROTTLE_STATUSES).sum()),
+            "p50_ms": float(np.percentile(lat, 50)), "p95_ms": float(np.percentile(lat, 95)),
+            "p99_ms": float(np.percentile(lat, 99)),
+        }
+
+    def report(self) -> str:
+        s = self.summary()
+        return (f"{s['requests']} requests in {s['elapsed_s']:.1f}s ({s['req_per_s']:.1f} req/s), "
+                f"{s['throttled']} throttled, latency p50 {s['p50_ms']:.0f} ms / p95 {s['p95_ms']:.0f} ms "
+                f"/ p99 {s['p99_ms']:.0f} ms")
+
+def _retry_delay(attempt, base, cap, retry_after=None):
+    """
+    Full jitter, uniform in [0, min(cap, base * 2**attempt)], added on top of
+    Retry-After so requests throttled together do not all return together.
+    """
+    delay = random.uniform(0, min(cap, base * 2 ** attempt))
+    if retry_after:
+        try:
+            delay += float(retry_after)
+        except ValueError:
+            pass
+    return delay
+
+async def run_batches(
+    url: str,
+    plan: List[Tuple[List[str], List[str]]],
+    on_result: Callable,
+    timeout: float = 15.0,
+    max_retries: int = 5,
+    rate: float = 50.0,
+    burst: Optional[float] = None,
+    initial_concurrency: int = 8,
+    max_concurrency: int = 64,
+    backoff: float = 0.5,
+    backoff_cap: float = 20.0,
+    stats: Optional[FetchStats] = None,
+    limiter: Optional[AIMDLimiter] = None,
+):
+    """
+    Fetch every (table_ids, geoids) request in `plan` and call
+    on_result(table_ids, geoids, rows, error) as each one finishes, where rows
+    is {table_id: {geoid: table row}} or None once retries run out.
+    """
+    bucket = TokenBucket(rate, burst)
+    limiter = limiter or AIMDLimiter(initial_concurrency, maximum=max_concurrency, bucket=bucket)
+    stats = stats or FetchStats()
+    headers = {"User-Agent": "cr-batcher/1.0"}
+
+    if aiohttp is not None:
+        session = aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=timeout))
+
+        async def get(params):
+            async with session.get(url, params=params) as r:
+                return r.status, r.headers.get("Retry-After"), await r.read()
+    else:
+        local = threading.local()
+        pool = ThreadPoolExecutor(max_workers=max_concurrency)
+
+        def blocking_get(params):
+            if not hasattr(local, "session"):
+                local.session = requests.Session()
+                local.session.headers.update(headers)
+            r = local.session.get(url, params=params, timeout=timeout)
+            return r.status_code, r.headers.get("Retry-After"), r.content
+
+        async def get(params):
+            return await asyncio.get_running_loop().run_in_executor(pool, blocking_get, params)
+
+    async def one(table_ids, geoids):
+        params = {"table_ids": ",".join(table_ids), "geo_ids": ",".join(geoids)}
+        last_exc = None
+        for attempt in range(max_retries):
+            await bucket.acquire()
+            await limiter.acquire()
+            t0 = time.perf_counter()
+            status, retry_after = 0, None
+            try:
+                status, retry_after, body = await get(params)
+                if status == 200:
+                    data = json.loads(body).get("data", {})
+                    return {t: {g: data.get(g, {}).get(t, {}) for g in geoids} for t in table_ids}, None
+                last_exc = requests.HTTPError(f"HTTP {status}")
+            except RETRY_ERRORS as e:
+                last_exc = e
+            finally:
+                stats.record(time.perf_counter() - t0, status)
+                await limiter.release(throttled=status in THROTTLE_STATUSES or status == 0)
+            if status and status not in THROTTLE_STATUSES:
+                break   # 4xx other than 429 will not get better
+            await asyncio.sleep(_retry_delay(attempt, backoff, backoff_cap, retry_after))
+        return None, last_exc
+
+    async def run(table_ids, geoids):
+        rows, err = await one(table_ids, geoids)
+        on_result(table_ids, geoids, rows, err)
+
+    try:
+        await asyncio.gather(*(run(tg, b) for tg, b in plan))
+    finally:
+        if aiohttp is not None:
+            await session.close()
+        else:
+            pool.shutdown(wait=False)
+    return stats
@@ -0,0 +1,90 @@
+import json
+import sqlite3
+import time
+from typing import Dict, Iterable, List, Optional
+
+'''
+---------------------------------------------------------------------------------------------------------------------
+On-disk cache of Census Reporter table rows, keyed by (acs release, table_id, geoid).
+A row is the whole {"estimate": {...}, "error": {...}} record of one table for one tract,
+so any column of an already fetched table is served without another request.
+Batches that ran out of retries are remembered so the next run retries exactly those.
+---------------------------------------------------------------------------------------------------------------------
+'''
+
+class ResponseCache:
+    def __init__(self, path: str = "Census_Reporter_API_calls/cr_cache.sqlite", ttl: Optional[float] = None):
+        """
+        path: SQLite file (":memory:" for a throwaway cache).
+        ttl: seconds a row stays fresh; None keeps rows forever.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS rows (
+                acs TEXT, table_id TEXT, geoid TEXT, payload TEXT, fetched_at REAL,
+                PRIMARY KEY (acs, table_id, geoid));
+            CREATE TABLE IF NOT EXISTS failed_batches (
+                acs TEXT, table_id TEXT, geoids TEXT, error TEXT, failed_at REAL,
+                PRIMARY KEY (acs, table_id, geoids));
+        """)
+        self.hits = self.misses = self.fetched = self.failed = 0
+
+    def close(self):
+        self.conn.close()
+
+    def get_many(self, acs: str, table_id: str, geoids: Iterable[str]) -> Dict[str, dict]:
+        """Fresh cached rows for `geoids` as {geoid: row}; absent or expired keys count as misses."""
+        geoids = list(geoids)
+        oldest = time.time() - self.ttl if self.ttl is not None else float("-inf")
+        found = {}
+        for i in range(0, len(geoids), 900):   # stay under SQLite's bound-variable limit
+            chunk = geoids[i:i + 900]
+            q = ("SELECT geoid, payload FROM rows WHERE acs=? AND table_id=? AND fetched_at>=? "
+                 f"AND geoid IN ({','.join('?' * len(chunk))})")
+            for geoid, payload in self.conn.execute(q, [acs, table_id, oldest, *chunk]):
+                found[geoid] = json.loads(payload)
+        self.hits += len(found)
+        self.misses += len(geoids) - len(found)
+        return found
+
+    def put_many(self, acs: str, table_id: str, rows: Dict[str, dict]):
+        """Store {geoid: row}; a geoid the API had no data for is stored as {} so it is not refetched."""
+        now = time.time()
+        with self.conn:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO rows VALUES (?, ?, ?, ?, ?)",
+                [(acs, table_id, g, json.dumps(r), now) for g, r in rows.items()])
+        self.fetched += len(rows)
+
+    def mark_failed(self, acs: str, table_id: str, geoids: List[str], error: str = ""):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO failed_batches VALUES (?, ?, ?, ?, ?)",
+                              (acs, table_id, ",".join(geoids), error, time.time()))
+        self.failed += 1
+
+    def clear_failed(self, acs: str, table_id: str, geoids: List[str]):
+        with self.conn:
+            self.conn.execute("DELETE FROM failed_batches WHERE acs=? AND table_id=? AND geoids=?",
+                              (acs, table_id, ",".join(geoids)))
+
+    def failed_batches(self, acs: str, table_id: str) -> List[List[str]]:
+        q = "SELECT geoids FROM failed_batches WHERE acs=? AND table_id=? ORDER BY failed_at"
+        return [g.split(",") for (g,) in self.conn.execute(q, (acs, table_id))]
+
+    def releases(self) -> List[str]:
+        """Concrete release ids with cached rows, oldest first ("acs2022_5yr" < "acs2023_5yr")."""
+        q = "SELECT DISTINCT acs FROM rows WHERE acs != 'latest'"
+        return sorted(a for (a,) in self.conn.execute(q))
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {"hits": self.hits, "misses": self.misses, "fetched": self.fetched,
+                "failed_batches": self.failed, "hit_rate": self.hits / total if total else 0.0}
+
+    def report(self) -> str:
+        s = self.stats()
+        return (f"cache: {s['hits']} hits, {s['misses']} misses ({s['hit_rate']:.0%} hit rate), "
+                f"{s['fetched']} rows fetched, {s['failed_batches']} failed batches")
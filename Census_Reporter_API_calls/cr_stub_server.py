@@ -0,0 +1,172 @@
+import hashlib
+import json
+import random
+import sqlite3
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+'''
+---------------------------------------------------------------------------------------------------------------------
+Local stand-in for api.censusreporter.org/1.0/data/show/<acs>, for offline runs and tests.
+Rows come from a recording (a ResponseCache SQLite file from a real run) or, for keys the
+recording lacks, are synthesized deterministically from (table_id, geoid, column). As on the
+real API, "latest" answers as a concrete release: the newest one recorded, else LATEST_RELEASE.
+For load tests it can add latency (mean + uniform jitter) and throttle: requests beyond
+`max_rps` (a server-side token bucket) get 429 with Retry-After, like the real API.
+Point the fetchers at it with base_url="http://127.0.0.1:<port>/1.0/data/show".
+---------------------------------------------------------------------------------------------------------------------
+'''
+
+LATEST_RELEASE = "acs2023_5yr"
+_templates = {}
+
+def synthetic_row_json(table_id, geoid, n_columns=80):
+    """
+    Deterministic fake {"estimate", "error"} record for one table and tract,
+    already JSON-encoded: a per-table template is filled with hash-derived
+    numbers, which keeps the stub cheap enough not to skew load tests.
+    """
+    key = (table_id, n_columns)
+    if key not in _templates:
+        cols = [f"{table_id}{i:03d}" for i in range(1, n_columns + 1)]
+        _templates[key] = ('{"estimate":{' + ",".join(f'"{c}":%d.0' for c in cols) + '},"error":{'
+                           + ",".join(f'"{c}":%d.0' for c in cols) + '}}')
+    raw = hashlib.shake_128(f"{table_id}|{geoid}".encode()).digest(4 * n_columns)
+    vals = [int.from_bytes(raw[i:i + 2], "big") for i in range(0, 4 * n_columns, 2)]
+    return _templates[key] % tuple([v % 5000 for v in vals[::2]] + [v % 97 for v in vals[1::2]])
+
+def synthetic_row(table_id, geoid, n_columns=80):
+    return json.loads(synthetic_row_json(table_id, geoid, n_columns))
+
+class StubState:
+    def __init__(self, recording=None, fail_rate=0.0, seed=0, n_columns=80,
+                 latency_ms=0.0, jitter_ms=0.0, max_rps=None, burst=None):
+        self.rows = {}
+        if recording:
+            conn = sqlite3.connect(recording)
+            for acs, table_id, geoid, payload in conn.execute("SELECT acs, table_id, geoid, payload FROM rows"):
+                self.rows[(acs, table_id, geoid)] = json.loads(payload)
+            conn.close()
+        self.latest = max((acs for acs, _, _ in self.rows if acs != "latest"), default=LATEST_RELEASE)
+        self.fail_rate = fail_rate
+        self.n_columns = n_columns
+        self.rng = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = self.throttled = 0
+        self.latency_ms, self.jitter_ms = latency_ms, jitter_ms
+        self.max_rps = max_rps
+        self.capacity = burst if burst is not None else (max_rps or 0)
+        self.tokens, self.stamp = self.capacity, time.monotonic()
+
+    def row_json(self, acs, table_id, geoid):
+        rec = self.rows.get((acs, table_id, geoid))
+        return json.dumps(rec) if rec is not None else synthetic_row_json(table_id, geoid, self.n_columns)
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            return self.rng.random() < self.fail_rate
+
+    def should_throttle(self):
+        if not self.max_rps:
+            return False
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.stamp) * self.max_rps)
+            self.stamp = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return False
+            self.throttled += 1
+            return True
+
+    def delay(self):
+        if self.latency_ms or self.jitter_ms:
+            with self.lock:
+                extra = self.rng.uniform(0, self.jitter_ms)
+            time.sleep((self.latency_ms + extra) / 1e3)
+
+def make_handler(state):
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            prefix = "/1.0/data/show/"
+            if not url.path.startswith(prefix):
+                self.send_error(404)
+                return
+            if state.should_throttle():
+                self.send_response(429)
+                self.send_header("Retry-After", "1")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            state.delay()
+            if state.should_fail():
+                self.send_error(503, "injected failure")
+                return
+            acs = url.path[len(prefix):]
+            if acs == "latest":
+                acs = state.latest
+            q = parse_qs(url.query)
+            tables = q.get("table_ids", [""])[0].split(",")
+            geoids = q.get("geo_ids", [""])[0].split(",")
+            data = ",".join(json.dumps(g) + ":{" + ",".join(json.dumps(t) + ":" + state.row_json(acs, t, g)
+                                                             for t in tables) + "}" for g in geoids)
+            payload = (f'{{"release":{json.dumps({"id": acs})},'
+                       f'"tables":{json.dumps({t: {"title": t} for t in tables})},'
+                       f'"data":{{{data}}}}}').encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    return StubHandler
+
+class StubServer(ThreadingHTTPServer):
+    request_queue_size = 256   # room for a burst of concurrent clients
+    daemon_threads = True
+
+def serve(port=0, recording=None, fail_rate=0.0, seed=0, latency_ms=0.0, jitter_ms=0.0, max_rps=None, burst=None):
+    """Start the stub in a daemon thread; returns (server, base_url). Stop with server.shutdown()."""
+    state = StubState(recording, fail_rate, seed, latency_ms=latency_ms, jitter_ms=jitter_ms,
+                      max_rps=max_rps, burst=burst)
+    server = StubServer(("127.0.0.1", port), make_handler(state))
+    server.state = state
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}/1.0/data/show"
+
+def _serve_forever(port, kwargs, ready):
+    server, _ = serve(port, **kwargs)
+    ready.put(server.server_address[1])
+    threading.Event().wait()
+
+def serve_in_process(port=0, **kwargs):
+    """
+    Run the stub in its own process so its CPU time does not share the GIL
+    with the client being measured. Returns (process, base_url); stop with
+    process.terminate().
+    """
+    import multiprocessing as mp
+    ready = mp.Queue()
+    proc = mp.Process(target=_serve_forever, args=(port, kwargs, ready), daemon=True)
+    proc.start()
+    return proc, f"http://127.0.0.1:{ready.get(timeout=30)}/1.0/data/show"
+
+if __name__ == "__main__":
+    # python Census_Reporter_API_calls/cr_stub_server.py 8765 [recording.sqlite] [fail_rate]
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    recording = sys.argv[2] if len(sys.argv) > 2 else None
+    fail_rate = float(sys.argv[3]) if len(sys.argv) > 3 else 0.0
+    server, base_url = serve(port, recording, fail_rate)
+    print(f"Serving Census Reporter stub at {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
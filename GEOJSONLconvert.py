@@ -1,62 +1,405 @@
 import json
+import gzip
+import math
 import os # Used here just for demonstration file paths
+import sys
+import time
+import numpy as np
 
-def geojsonl_to_geojson(input_filepath, output_filepath):
+try:
+    import orjson  # optional, several times faster than json for both parsing and writing
+except ImportError:
+    orjson = None
+
+GEOMETRY_TYPES = ['Point', 'LineString', 'Polygon', 'MultiPoint', 'MultiLineString', 'MultiPolygon', 'GeometryCollection']
+
+def _open(filepath, mode):
+    """open() that transparently (de)compresses paths ending in .gz."""
+    return gzip.open(filepath, mode) if filepath.endswith('.gz') else open(filepath, mode)
+
+def _codec(indent, backend):
+    """
+    (loads, dumps) for the chosen backend; dumps returns bytes. orjson only
+    indents by 2, and writes non-ASCII text as UTF-8 instead of \\u escapes.
+    """
+    use_orjson = orjson is not None and backend in ('auto', 'orjson') and indent in (None, 2)
+    if backend == 'orjson' and not use_orjson:
+        raise ValueError("orjson backend needs orjson installed and indent of None or 2")
+    if use_orjson:
+        opt = orjson.OPT_INDENT_2 if indent == 2 else 0
+        return orjson.loads, lambda obj: orjson.dumps(obj, option=opt)
+    if indent is None:
+        return json.loads, lambda obj: json.dumps(obj, separators=(',', ':')).encode('utf-8')
+    return json.loads, lambda obj: json.dumps(obj, indent=indent).encode('utf-8')
+
+def iter_features(input_filepath, loads=json.loads):
+    """
+    Yields one Feature per GEOJSONL line (bare geometries are wrapped),
+    reading .gz input transparently and never holding more than one line.
+    """
+    with _open(input_filepath, 'rb') as f:
+        for line in f:
+            # Skip empty lines or lines with only whitespace
+            if not line.strip():
+                continue
+
+            try:
+                # Parse the JSON object from the line
+                obj = loads(line)
+            except ValueError as e:
+                print(f"Error decoding JSON on line: {line.strip().decode('utf-8', 'replace')}. Error: {e}")
+                continue
+
+            # Ensure the object is a Feature.
+            # If it's a Geometry, wrap it in a Feature.
+            if obj.get('type') == 'Feature':
+                yield obj
+            elif obj.get('type') in GEOMETRY_TYPES:
+                # Create a minimal Feature object
+                yield {
+                    "type": "Feature",
+                    "geometry": obj,
+                    "properties": {} # Add empty properties for compliance
+                }
+            else:
+                print(f"Warning: Skipped line with unknown GeoJSON type: {obj.get('type', 'No type field')}")
+
+def geojsonl_to_geojson(input_filepath, output_filepath, indent=2, backend='auto'):
     """
     Converts a GEOJSONL file to a standard GeoJSON FeatureCollection.
+
+    Features are written as they are parsed, so memory stays flat whatever
+    the input size. `.gz` input and output paths are (de)compressed on the
+    fly. indent=2 reproduces json.dump(..., indent=2); indent=None writes
+    compact output. backend is 'auto' (orjson when installed), 'orjson' or
+    'json'. Returns the number of features written.
     """
-    features = []
-    
-    # 1. Read and parse each line
-    try:
-        with open(input_filepath, 'r', encoding='utf-8') as f:
-            for line in f:
-                # Skip empty lines or lines with only whitespace
-                if not line.strip():
-                    continue
-                
-                try:
-                    # Parse the JSON object from the line
-                    obj = json.loads(line)
-                    
-                    # Ensure the object is a Feature. 
-                    # If it's a Geometry, wrap it in a Feature.
-                    if obj.get('type') == 'Feature':
-                        features.append(obj)
-                    elif obj.get('type') in ['Point', 'LineString', 'Polygon', 'MultiPoint', 'MultiLineString', 'MultiPolygon', 'GeometryCollection']:
-                        # Create a minimal Feature object
-                        features.append({
-                            "type": "Feature",
-                            "geometry": obj,
-                            "properties": {} # Add empty properties for compliance
-                        })
-                    else:
-                        print(f"Warning: Skipped line with unknown GeoJSON type: {obj.get('type', 'No type field')}")
-                        
-                except json.JSONDecodeError as e:
-                    print(f"Error decoding JSON on line: {line.strip()}. Error: {e}")
-
-    except FileNotFoundError:
+    if not os.path.exists(input_filepath):
         print(f"Error: Input file not found at {input_filepath}")
         return
-    
-    # 2. Construct the final FeatureCollection
-    feature_collection = {
-        "type": "FeatureCollection",
-        "features": features
-    }
-    
-    # 3. Write the final object to the standard GeoJSON file
+    loads, dumps = _codec(indent, backend)
+    if indent is None:
+        head, sep, tail = b'{"type":"FeatureCollection","features":[', b',', b']}'
+    else:
+        pad = b' ' * indent
+        head = b'{\n' + pad + b'"type": "FeatureCollection",\n' + pad + b'"features": ['
+        sep, tail = b',\n' + pad * 2, b'\n' + pad + b']\n}'
+        nested = b'\n' + pad * 2
+
+    start = time.perf_counter()
+    n = 0
     try:
-        with open(output_filepath, 'w', encoding='utf-8') as f:
-            # Use indent=2 for human-readable output, remove for minimal file size
-            json.dump(feature_collection, f, indent=2)
-            
-        print(f"Conversion successful! Wrote {len(features)} features to {output_filepath}")
-        
+        with _open(output_filepath, 'wb') as out:
+            out.write(head)
+            for feature in iter_features(input_filepath, loads):
+                text = dumps(feature)
+                if indent is not None:
+                    text = text.replace(b'\n', nested)
+                out.write(sep if n else sep[1:])
+                out.write(text)
+                n += 1
+            # an empty list closes on the same line: "features": []
+            out.write(tail if n else tail.lstrip(b' \n'))
     except IOError as e:
         print(f"Error writing to output file: {e}")
+        return
+
+    elapsed = time.perf_counter() - start
+    print(f"Conversion successful! Wrote {n} features to {output_filepath} "
+          f"({n / max(elapsed, 1e-9):,.0f} features/sec)")
+    return n
+
+# ---------------------------------------------------------------
+# Columnar binary cache: memory-mapped coordinates, typed property
+# columns, per-feature bounding boxes and a uniform grid index
+# ---------------------------------------------------------------
+GEOM_CODES = {t: i for i, t in enumerate(GEOMETRY_TYPES)}
+_KIND_RANK = {'bool': 0, 'int': 1, 'float': 2, 'str': 3, 'json': 4}
+
+def _geometry_parts(geom):
+    """Flatten any geometry into a list of parts, each a list of [x, y(, z)] positions."""
+    t, coords = geom.get('type'), geom.get('coordinates')
+    if t == 'Point':
+        return [[coords]] if coords else []
+    if t in ('MultiPoint',):
+        return [[c] for c in coords]
+    if t == 'LineString':
+        return [coords]
+    if t in ('MultiLineString', 'Polygon'):
+        return list(coords)
+    if t == 'MultiPolygon':
+        return [ring for poly in coords for ring in poly]
+    if t == 'GeometryCollection':
+        return [p for g in geom.get('geometries', []) for p in _geometry_parts(g)]
+    return []
+
+def _kind(value):
+    if isinstance(value, bool):
+        return 'bool'
+    if isinstance(value, int):
+        return 'int'
+    if isinstance(value, float):
+        return 'float'
+    if isinstance(value, str):
+        return 'str'
+    return 'json'
+
+def _as_text(value, kind):
+    """Text cell: plain strings stay as-is in 'str' columns, everything else is JSON."""
+    if kind == 'str' and isinstance(value, str):
+        return value
+    return json.dumps(value, separators=(',', ':'))
+
+def geojsonl_to_columns(input_filepath, output_dir, columns=None, cell=0.5, max_cells=64, backend='auto',
+                        chunk=65536):
+    """
+    Converts a GEOJSONL file into a directory of .npy arrays that
+    `FeatureStore` memory-maps, so later reads never parse JSON.
+
+    Two streaming passes keep memory flat: the first sizes every array and
+    infers one type per property column (bool -> int8 with -1 for missing,
+    int -> int64, or float64 with NaN if any value is missing, float ->
+    float64, str and nested values -> UTF-8 bytes + offsets, missing as
+    ""), the second fills preallocated memmaps. `columns` limits which
+    properties are kept. Features are also bucketed into a grid of `cell`
+    degrees; features whose bounding box spans more than `max_cells` cells
+    go to an overflow list that every query checks.
+    """
+    if not os.path.exists(input_filepath):
+        print(f"Error: Input file not found at {input_filepath}")
+        return
+    loads, _ = _codec(None, backend)
+    start = time.perf_counter()
+
+    # pass 1: array sizes and column kinds
+    n = n_parts = n_points = 0
+    kinds, missing = {}, {}
+    for feature in iter_features(input_filepath, loads):
+        parts = _geometry_parts(feature.get('geometry') or {})
+        n_parts += len(parts)
+        n_points += sum(len(p) for p in parts)
+        props = feature.get('properties') or {}
+        for k, v in props.items():
+            if columns is not None and k not in columns:
+                continue
+            if k not in kinds:
+                kinds[k], missing[k] = None, n
+            if v is None:
+                missing[k] += 1
+                continue
+            kd = _kind(v)
+            if kinds[k] is None or _KIND_RANK[kd] > _KIND_RANK[kinds[k]]:
+                kinds[k] = kd
+        for k in kinds:
+            if k not in props:
+                missing[k] += 1
+        n += 1
+    for k, kd in kinds.items():
+        if kd is None:
+            kinds[k] = 'str'
+        elif kd == 'int' and missing[k]:
+            kinds[k] = 'float'
+
+    os.makedirs(output_dir, exist_ok=True)
+    def new(name, dtype, shape):
+        return np.lib.format.open_memmap(os.path.join(output_dir, name + '.npy'), mode='w+', dtype=dtype, shape=shape)
+
+    coords = new('coords', np.float64, (n_points, 2))
+    part_ptr = new('part_ptr', np.int64, (n_parts + 1,))
+    feature_ptr = new('feature_ptr', np.int64, (n + 1,))
+    geom_type = new('geom_type', np.int8, (n,))
+    bbox = new('bbox', np.float64, (n, 4))
+    numeric, text = {}, []
+    for k, kd in kinds.items():
+        if kd == 'bool':
+            numeric[k] = (new('col.' + k, np.int8, (n,)), -1)
+        elif kd == 'int':
+            numeric[k] = (new('col.' + k, np.int64, (n,)), 0)
+        elif kd == 'float':
+            numeric[k] = (new('col.' + k, np.float64, (n,)), np.nan)
+        else:
+            text.append(k)
+
+    # pass 2: fill the arrays, buffering `chunk` features between memmap writes
+    str_cols = {k: new('col.' + k + '.ptr', np.int64, (n + 1,)) for k in text}
+    str_bytes = {k: open(os.path.join(output_dir, 'col.' + k + '.bytes'), 'wb') for k in text}
+    pos = {'feature': 0, 'part': 0, 'point': 0, **{k: 0 for k in text}}
+
+    def flush(buf):
+        i, q, p = pos['feature'], pos['part'], pos['point']
+        m = len(buf['geom'])
+        xy = np.array(buf['xy'], dtype=np.float64).reshape(-1, 2)
+        lens = np.array(buf['part_len'], dtype=np.int64)
+        counts = np.array(buf['n_parts'], dtype=np.int64)
+        coords[p:p + len(xy)] = xy
+        part_ptr[q + 1:q + 1 + len(lens)] = p + np.cumsum(lens)
+        feature_ptr[i + 1:i + 1 + m] = q + np.cumsum(counts)
+        geom_type[i:i + m] = buf['geom']
+        # per-feature bounding boxes with one reduceat over the chunk's points
+        part_end = np.r_[0, np.cumsum(lens)]
+        feat_end = np.r_[0, np.cumsum(counts)]
+        npts = part_end[feat_end[1:]] - part_end[feat_end[:-1]]
+        has = npts > 0
+        box = np.full((m, 4), np.nan)
+        if has.any():
+            starts = (np.cumsum(npts) - npts)[has]
+            box[has, 0] = np.minimum.reduceat(xy[:, 0], starts)
+            box[has, 1] = np.minimum.reduceat(xy[:, 1], starts)
+            box[has, 2] = np.maximum.reduceat(xy[:, 0], starts)
+            box[has, 3] = np.maximum.reduceat(xy[:, 1], starts)
+        bbox[i:i + m] = box
+        for k, (arr, _) in numeric.items():
+            arr[i:i + m] = buf[k]
+        for k, ptr in str_cols.items():
+            blobs = buf[k]
+            str_bytes[k].write(b''.join(blobs))
+            ptr[i + 1:i + 1 + m] = pos[k] + np.cumsum([len(x) for x in blobs])
+            pos[k] = int(ptr[i + m])
+        pos['feature'], pos['part'], pos['point'] = i + m, q + len(lens), p + len(xy)
+
+    def empty():
+        return {'xy': [], 'part_len': [], 'n_parts': [], 'geom': [], **{k: [] for k in kinds}}
+
+    buf = empty()
+    try:
+        for feature in iter_features(input_filepath, loads):
+            geom = feature.get('geometry') or {}
+            buf['geom'].append(GEOM_CODES.get(geom.get('type'), -1))
+            parts = _geometry_parts(geom)
+            buf['n_parts'].append(len(parts))
+            for part in parts:
+                buf['part_len'].append(len(part))
+                buf['xy'].extend(pos_[:2] for pos_ in part)
+            props = feature.get('properties') or {}
+            for k, (_, fill) in numeric.items():
+                v = props.get(k)
+                buf[k].append(fill if v is None else v)
+            for k in str_cols:
+                v = props.get(k)
+                buf[k].append(b'' if v is None else _as_text(v, kinds[k]).encode('utf-8'))
+            if len(buf['geom']) == chunk:
+                flush(buf)
+                buf = empty()
+        if buf['geom']:
+            flush(buf)
+    finally:
+        for f in str_bytes.values():
+            f.close()
+
+    # grid index over the bounding boxes
+    ok = ~np.isnan(bbox[:, 0])
+    if ok.any():
+        west, south = bbox[ok, 0].min(), bbox[ok, 1].min()
+        east, north = bbox[ok, 2].max(), bbox[ok, 3].max()
+    else:
+        west = south = east = north = 0.0
+    nx = max(int(math.floor((east - west) / cell)) + 1, 1)
+    ny = max(int(math.floor((north - south) / cell)) + 1, 1)
+    fid = np.flatnonzero(ok)
+    cx0, cy0, cx1, cy1 = (np.floor((bbox[fid][:, j] - o) / cell).astype(np.int64)
+                          for j, o in ((0, west), (1, south), (2, west), (3, south)))
+    span = (cx1 - cx0 + 1) * (cy1 - cy0 + 1)
+    big = span > max_cells
+    small = fid[~big]
+    w = (cx1 - cx0 + 1)[~big]
+    owner = np.repeat(np.arange(len(small)), span[~big])
+    k = np.arange(len(owner)) - np.repeat(np.cumsum(span[~big]) - span[~big], span[~big])
+    cells = (cy0[~big][owner] + k // w[owner]) * nx + cx0[~big][owner] + k % w[owner]
+    order = np.argsort(cells, kind='stable')
+    grid_ptr = np.zeros(nx * ny + 1, dtype=np.int64)
+    np.cumsum(np.bincount(cells, minlength=nx * ny), out=grid_ptr[1:])
+    np.save(os.path.join(output_dir, 'grid_ptr.npy'), grid_ptr)
+    np.save(os.path.join(output_dir, 'grid_items.npy'), small[owner[order]])
+    np.save(os.path.join(output_dir, 'grid_overflow.npy'), fid[big])
+
+    meta = {
+        "n_features": n, "columns": kinds, "geometry_types": GEOMETRY_TYPES,
+        "grid": {"west": float(west), "south": float(south), "cell": cell, "nx": nx, "ny": ny},
+    }
+    with open(os.path.join(output_dir, 'meta.json'), 'w', encoding='utf-8') as f:
+        json.dump(meta, f, indent=2)
+    for arr in (coords, part_ptr, feature_ptr, geom_type, bbox, *(a for a, _ in numeric.values()),
+                *str_cols.values()):
+        arr.flush()
+
+    elapsed = time.perf_counter() - start
+    print(f"Conversion successful! Wrote {n} features ({len(kinds)} columns) to {output_dir} "
+          f"({n / max(elapsed, 1e-9):,.0f} features/sec)")
+    return n
+
+class FeatureStore:
+    """
+    Read side of `geojsonl_to_columns`. Every array is memory-mapped, so
+    opening is near-instant and only the pages a query touches are read.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, 'meta.json'), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        load = lambda name: np.load(os.path.join(directory, name + '.npy'), mmap_mode='r')
+        self.coords = load('coords')
+        self.part_ptr = load('part_ptr')
+        self.feature_ptr = load('feature_ptr')
+        self.geom_type = load('geom_type')
+        self.bbox = load('bbox')
+        self._grid = (load('grid_ptr'), load('grid_items'), load('grid_overflow'))
+        self._load = load
+
+    def __len__(self):
+        return self.meta['n_features']
+
+    @property
+    def columns(self):
+        return list(self.meta['columns'])
+
+    def column(self, name, index=None):
+        """
+        Property column `name`, optionally only rows `index`. Numeric columns
+        come back as (memory-mapped) arrays, text columns as a list of str.
+        """
+        kind = self.meta['columns'][name]
+        if kind not in ('str', 'json'):
+            arr = self._load('col.' + name)
+            return arr if index is None else arr[index]
+        ptr = self._load('col.' + name + '.ptr')
+        raw = np.memmap(os.path.join(self.directory, 'col.' + name + '.bytes'), dtype=np.uint8, mode='r') \
+            if ptr[-1] else np.zeros(0, dtype=np.uint8)
+        rows = range(len(self)) if index is None else np.atleast_1d(index)
+        return [bytes(raw[ptr[i]:ptr[i + 1]]).decode('utf-8') for i in rows]
+
+    def geometry(self, i):
+        """Parts of feature `i` as a list of (k, 2) coordinate arrays."""
+        parts = self.part_ptr[self.feature_ptr[i]:self.feature_ptr[i + 1] + 1]
+        return [self.coords[a:b] for a, b in zip(parts[:-1], parts[1:])]
+
+    def query_bbox(self, west, south, east, north):
+        """Indices of features whose bounding box intersects the query box."""
+        grid_ptr, items, overflow = self._grid
+        g = self.meta['grid']
+        cx0 = max(int(math.floor((west - g['west']) / g['cell'])), 0)
+        cy0 = max(int(math.floor((south - g['south']) / g['cell'])), 0)
+        cx1 = min(int(math.floor((east - g['west']) / g['cell'])), g['nx'] - 1)
+        cy1 = min(int(math.floor((north - g['south']) / g['cell'])), g['ny'] - 1)
+        found = [np.asarray(overflow)]
+        if cx0 <= cx1 and cy0 <= cy1:
+            # the cells of one grid row are contiguous in the index
+            for cy in range(cy0, cy1 + 1):
+                found.append(items[grid_ptr[cy * g['nx'] + cx0]:grid_ptr[cy * g['nx'] + cx1 + 1]])
+        cand = np.unique(np.concatenate(found))
+        b = self.bbox[cand]
+        hit = (b[:, 0] <= east) & (b[:, 2] >= west) & (b[:, 1] <= north) & (b[:, 3] >= south)
+        return cand[hit]
 
 # Example Usage (assuming 'input.geojsonl' exists)
 # geojsonl_to_geojson('input.geojsonl', 'output.geojson')
-
+# geojsonl_to_geojson('stops.geojsonl.gz', 'stops.geojson', indent=None)
+# geojsonl_to_columns('stops.geojsonl.gz', 'stops_cache/'); FeatureStore('stops_cache/').query_bbox(-98, 30, -97.5, 30.5)
+if __name__ == "__main__":
+    if len(sys.argv) < 3:
+        print("usage: python GEOJSONLconvert.py INPUT.geojsonl[.gz] OUTPUT.geojson[.gz] [--compact]\n"
+              "       python GEOJSONLconvert.py INPUT.geojsonl[.gz] OUTPUT_DIR --columns")
+        sys.exit(1)
+    if "--columns" in sys.argv:
+        geojsonl_to_columns(sys.argv[1], sys.argv[2])
+    else:
+        geojsonl_to_geojson(sys.argv[1], sys.argv[2], indent=None if "--compact" in sys.argv else 2)
@@ -0,0 +1,369 @@
+# aco_engine.py
+import random
+import dataclasses
+from itertools import combinations
+import multiprocessing as mp
+from multiprocessing import shared_memory
+import numpy as np
+from csr_graph import CSRGraph
+
+# ---------------------------------------
+# Heuristics and candidate lists
+# ---------------------------------------
+def heuristic_table(graph, sink, heuristic="length"):
+    """
+    Per-slot desirability eta on the padded neighbour table (0 on padding).
+    "length": 1/length, as in construct_path.
+    "goal":   1/(1 + detour), where detour = l(u,v) + h(v) - h(u) >= 0 is how much
+              the step lengthens the best remaining route and h is the distance
+              to `sink` from one Dijkstra. Nodes that cannot reach the sink get 0.
+    """
+    nbr, nbr_edge = graph.padded()
+    pad = nbr_edge < 0
+    l = graph.length[nbr_edge]
+    if heuristic == "length":
+        return np.where(pad, 0.0, 1.0 / l)
+    if heuristic == "goal":
+        h = graph.dijkstra(sink)
+        with np.errstate(invalid='ignore'):
+            detour = l + h[nbr] - h[:, None]
+        return np.where(pad | ~np.isfinite(detour), 0.0, 1.0 / (1.0 + np.maximum(detour, 0.0)))
+    raise ValueError(f"unknown heuristic: {heuristic}")
+
+def candidate_lists(nbr, nbr_edge, eta, k):
+    """Keep each node's k most desirable neighbours (by eta) as a narrower table."""
+    order = np.argsort(-eta, axis=-1, kind='stable')[..., :k]
+    take = lambda t: np.take_along_axis(t, order, axis=-1)
+    return take(nbr), take(nbr_edge), take(eta)
+
+def selection_tables(graph, sinks, heuristic="length", beta=4.0, n_candidates=None):
+    """
+    (tables, fallback) of (nbr, nbr_edge, eta**beta) for path construction.
+    Sink-dependent heuristics get one (n, width) layer per sink, stacked as
+    (n_sinks, n, width); ants pick their layer through their group index.
+    """
+    nbr, nbr_edge = graph.padded()
+    if heuristic == "length":
+        base = (nbr, nbr_edge, heuristic_table(graph, None, heuristic) ** beta)
+    else:
+        eta_b = np.stack([heuristic_table(graph, s, heuristic) ** beta for s in sinks])
+        base = (np.broadcast_to(nbr, eta_b.shape), np.broadcast_to(nbr_edge, eta_b.shape), eta_b)
+    if n_candidates and n_candidates < nbr.shape[1]:
+        return candidate_lists(*base, n_candidates), base
+    return base, None
+
+def weighted_tables(tables, fallback, tau):
+    """Attach the cached tau**alpha to the eta**beta tables; refreshed per pheromone update."""
+    nbr, nbr_edge, eta_b = tables
+    full = (fallback[0], fallback[1], fallback[2] * tau[fallback[1]]) if fallback else None
+    return (nbr, nbr_edge, eta_b * tau[nbr_edge]), full
+
+# ---------------------------------------
+# Batched path construction
+# ---------------------------------------
+def _rows(table, groups, at):
+    return table[at] if table.ndim == 2 else table[groups, at]
+
+def _roulette(nbr, nbr_edge, weight, ants, at, visited, rng, groups):
+    """One roulette draw per ant over the unvisited options of its node `at`."""
+    g = groups[ants]
+    cand = _rows(nbr, g, at)
+    cum = np.cumsum(_rows(weight, g, at) * ~visited[ants[:, None], cand], axis=1)
+    total = cum[:, -1]
+    moved = total > 0
+    r = rng.random(len(at)) * total
+    pick = np.minimum((cum <= r[:, None]).sum(axis=1), nbr.shape[-1] - 1)
+    rows = np.arange(len(at))
+    return moved, cand[rows, pick], _rows(nbr_edge, g, at)[rows, pick]
+
+def construct_paths(nbr, nbr_edge, weight, length, sources, sinks, rng, max_steps=1000,
+                    fallback=None, groups=None, chunk=256):
+    """
+    Walk a whole batch of ants at once. Each step every live ant does a
+    roulette draw over its current node's row of `weight` (already
+    tau**alpha * eta**beta, 0 on padding), excluding nodes it has visited.
+    When the tables are candidate lists, `fallback` holds the full
+    (nbr, nbr_edge, weight) tables for ants whose candidates are exhausted.
+    Stacked (n_sinks, n, width) tables are indexed by each ant's `groups` entry.
+    Returns (node_trail, edge_trail, cost, ok, n_steps) where the trails are
+    (steps, n_ants) arrays padded with -1 after an ant stops. They grow by
+    `chunk` rows as the walk goes on, so memory follows the longest walk of
+    the batch rather than `max_steps`.
+    """
+    n_ants = len(sources)
+    n_nodes = nbr.shape[-2]
+    groups = np.zeros(n_ants, dtype=np.int64) if groups is None else np.asarray(groups)
+    rows = min(max_steps, chunk)
+    node_trail = np.full((rows + 1, n_ants), -1, dtype=np.int64)
+    edge_trail = np.full((rows, n_ants), -1, dtype=np.int64)
+    visited = np.zeros((n_ants, n_nodes), dtype=bool)
+    cur = np.asarray(sources, dtype=np.int64).copy()
+    sinks = np.asarray(sinks, dtype=np.int64)
+    visited[np.arange(n_ants), cur] = True
+    node_trail[0] = cur
+    cost = np.zeros(n_ants)
+    n_steps = np.zeros(n_ants, dtype=np.int64)
+    ok = cur == sinks
+    live = ~ok
+    step = 0
+    while step < max_steps:
+        act = np.flatnonzero(live)
+        if act.size == 0:
+            break
+        if step == rows:
+            more = min(chunk, max_steps - rows)
+            node_trail = np.vstack([node_trail, np.full((more, n_ants), -1, dtype=np.int64)])
+            edge_trail = np.vstack([edge_trail, np.full((more, n_ants), -1, dtype=np.int64)])
+            rows += more
+        c = cur[act]
+        moved, nxt, e = _roulette(nbr, nbr_edge, weight, act, c, visited, rng, groups)
+        if fallback is not None and not moved.all():
+            redo = np.flatnonzero(~moved)
+            moved[redo], nxt[redo], e[redo] = _roulette(*fallback, act[redo], c[redo], visited, rng, groups)
+        if not moved.all():
+            live[act[~moved]] = False
+            act, nxt, e = act[moved], nxt[moved], e[moved]
+        cost[act] += length[e]
+        visited[act, nxt] = True
+        cur[act] = nxt
+        node_trail[step + 1, act] = nxt
+        edge_trail[step, act] = e
+        n_steps[act] += 1
+        arrived = nxt == sinks[act]
+        ok[act[arrived]] = True
+        live[act[arrived]] = False
+        step += 1
+    return node_trail[:step + 1], edge_trail[:step], np.where(ok, cost, np.inf), ok, n_steps
+
+def deposit(edge_trail, cost, ok, Q, n_edges, weight=None):
+    """Sum Q/cost (times an optional per-ant weight) over every edge each successful ant used."""
+    E = edge_trail[:, ok]
+    used = E >= 0
+    per_ant = Q / cost[ok] if weight is None else Q * weight[ok] / cost[ok]
+    amount = np.broadcast_to(per_ant, E.shape)[used]
+    return np.bincount(E[used], weights=amount, minlength=n_edges)
+
+# ---------------------------------------
+# Colony driver
+# ---------------------------------------
+def run_colony(graph, source, sink, n_ants=100, n_iter=250, alpha=1.0, beta=4.0,
+               rho=0.3, Q=100, max_steps=1000, rng=None, log_every=25, pheromone=None,
+               heuristic="length", n_candidates=None, callback=None, tables=None):
+    """
+    ACO over integer node ids of a CSRGraph. Pheromone is one float per
+    undirected edge; evaporation and deposit are single array operations.
+    A `pheromone` array passed in is updated in place (islands hand in views
+    of a shared-memory field). Selection weights tau**alpha * eta**beta are
+    cached per table slot and refreshed once per pheromone update; with
+    `n_candidates` ants first choose among each node's best-eta neighbours.
+    `callback(iteration, info)` is called after every update. Callers that
+    run many short colonies on one graph pass the `selection_tables` result
+    as `tables` instead of rebuilding it each time.
+    Returns (pheromone, best_path_ids, best_cost).
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    tables, fallback = tables or selection_tables(graph, [sink], heuristic, beta, n_candidates)
+    if pheromone is None:
+        pheromone = np.ones(graph.n_edges)
+    sources = np.full(n_ants, source)
+    sinks = np.full(n_ants, sink)
+
+    best_path, best_cost, best_iter = None, float('inf'), None
+    for iteration in range(n_iter):
+        weighted, full = weighted_tables(tables, fallback, pheromone ** alpha)
+        nodes, edges, cost, ok, n_steps = construct_paths(
+            *weighted, graph.length, sources, sinks, rng, max_steps, full)
+        if ok.any():
+            a = int(np.argmin(cost))
+            if cost[a] < best_cost:
+                best_cost, best_iter = float(cost[a]), iteration
+                best_path = nodes[:n_steps[a] + 1, a].tolist()
+        pheromone *= (1 - rho)
+        pheromone += deposit(edges, cost, ok, Q, graph.n_edges)
+        if callback is not None:
+            callback(iteration, dict(best_cost=best_cost, best_iter=best_iter,
+                                     n_ok=int(ok.sum()), n_ants=n_ants))
+        if log_every and iteration % log_every == 0:
+            print(f"Iter {iteration:3d} | best = {best_cost:.2f}")
+    return pheromone, best_path, best_cost
+
+def vectorized_colony_path(nodes, edges, source, sink, n_ants=100, n_iter=250,
+                           alpha=1.0, beta=4.0, rho=0.3, Q=100, max_steps=1000,
+                           seed=None, log_every=25, heuristic="length", n_candidates=None,
+                           callback=None):
+    """
+    Drop-in for the dict-based `ant_colony_path`: takes the `grid_graph`
+    lists (or a prebuilt CSRGraph as `nodes`) and returns
+    (pheromone dict keyed by (u,v) labels, best_path labels, best_cost).
+    Without a seed the generator is drawn from `random`, so `random.seed`
+    in the demos still makes runs repeatable.
+    """
+    graph = nodes if isinstance(nodes, CSRGraph) else CSRGraph.from_edges(nodes, edges)
+    rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+    pheromone, best_ids, best_cost = run_colony(
+        graph, graph.node_id(source), graph.node_id(sink), n_ants, n_iter,
+        alpha, beta, rho, Q, max_steps, rng, log_every,
+        heuristic=heuristic, n_candidates=n_candidates, callback=callback)
+    best_path = graph.path_labels(best_ids) if best_ids is not None else None
+    return graph.edge_dict(pheromone), best_path, best_cost
+
+# ---------------------------------------
+# Network mode: many OD pairs, one field
+# ---------------------------------------
+def network_colony(nodes, edges, terminals, pairs=None, demand=None, pheromone=None,
+                   ants_per_pair=10, n_iter=100, alpha=1.0, beta=4.0, rho=0.3, Q=100,
+                   max_steps=1000, seed=None, log_every=25, heuristic="length",
+                   n_candidates=None, callback=None):
+    """
+    Route every origin/destination pair at once on one prebuilt graph and one
+    shared pheromone field. `terminals` maps names to node labels; `pairs`
+    defaults to all unordered pairs of terminals. `demand` maps a pair to a
+    weight that scales its ants' deposits (default 1). `pheromone` warm-starts
+    the field from a previous run (the returned dict, or a per-edge array),
+    so adding a terminal only needs its new pairs and a few iterations.
+    Returns (pheromone dict, {pair: best_path}, {pair: best_cost}).
+    """
+    graph = nodes if isinstance(nodes, CSRGraph) else CSRGraph.from_edges(nodes, edges)
+    rng = np.random.default_rng(random.getrandbits(64) if seed is None else seed)
+    pairs = list(pairs) if pairs is not None else list(combinations(terminals, 2))
+    demand = demand or {}
+    w = np.array([demand.get(p, demand.get(p[::-1], 1.0)) for p in pairs], dtype=float)
+    src = np.array([graph.node_id(terminals[a]) for a, _ in pairs])
+    dst = np.array([graph.node_id(terminals[b]) for _, b in pairs])
+    sink_ids, sink_group = np.unique(dst, return_inverse=True)
+    sources, sinks = np.repeat(src, ants_per_pair), np.repeat(dst, ants_per_pair)
+    groups, ant_weight = np.repeat(sink_group, ants_per_pair), np.repeat(w, ants_per_pair)
+    tables, fallback = selection_tables(graph, sink_ids, heuristic, beta, n_candidates)
+    if pheromone is None:
+        field = np.ones(graph.n_edges)
+    elif isinstance(pheromone, dict):
+        field = graph.edge_array(pheromone, default=1.0)
+    else:
+        field = np.array(pheromone, dtype=float)
+
+    P = len(pairs)
+    best_ids, best_cost = [None] * P, np.full(P, np.inf)
+    for iteration in range(n_iter):
+        weighted, full = weighted_tables(tables, fallback, field ** alpha)
+        trail, used, cost, ok, n_steps = construct_paths(
+            *weighted, graph.length, sources, sinks, rng, max_steps, full, groups)
+        per_pair = cost.reshape(P, ants_per_pair)
+        a = per_pair.argmin(axis=1)
+        improved = np.flatnonzero(per_pair[np.arange(P), a] < best_cost)
+        for p in improved:
+            ant = p * ants_per_pair + a[p]
+            best_cost[p] = cost[ant]
+            best_ids[p] = trail[:n_steps[ant] + 1, ant].tolist()
+        field *= (1 - rho)
+        field += deposit(used, cost, ok, Q, graph.n_edges, ant_weight)
+        routed = int(np.isfinite(best_cost).sum())
+        if callback is not None:
+            callback(iteration, dict(routed=routed, n_pairs=P, n_ok=int(ok.sum()),
+                                     n_ants=len(sources), total_cost=float(best_cost[np.isfinite(best_cost)].sum())))
+        if log_every and iteration % log_every == 0:
+            print(f"Iter {iteration:3d} | routed {routed}/{P} pairs | "
+                  f"total best = {best_cost[np.isfinite(best_cost)].sum():.2f}")
+    paths = {p: graph.path_labels(ids) if ids is not None else None for p, ids in zip(pairs, best_ids)}
+    costs = {p: float(c) for p, c in zip(pairs, best_cost)}
+    return graph.edge_dict(field), paths, costs
+
+# ---------------------------------------
+# Island model: one colony per process
+# ---------------------------------------
+_island = {}
+
+def _island_init(shm_name, shape, graph, source, sink, params):
+    """Pool initializer: attach the shared pheromone field and build the selection tables once per worker."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    tables = selection_tables(graph, [sink], params['heuristic'], params['beta'], params['n_candidates'])
+    _island.update(shm=shm, field=np.ndarray(shape, dtype=np.float64, buffer=shm.buf),
+                   graph=graph, source=source, sink=sink, params=params, tables=tables)
+
+def _island_epoch(task):
+    """Run `n_iter` iterations of island k on its own row of the shared field."""
+    k, n_iter, rng_state = task
+    rng = np.random.default_rng()
+    rng.bit_generator.state = rng_state
+    _, best_ids, best_cost = run_colony(_island['graph'], _island['source'], _island['sink'],
+                                        n_iter=n_iter, rng=rng, log_every=0,
+                                        pheromone=_island['field'][k], tables=_island['tables'],
+                                        **_island['params'])
+    return best_ids, best_cost, rng.bit_generator.state
+
+def exchange_pheromone(field, migration="ring", rate=0.5):
+    """
+    Mix the (n_islands, n_edges) field in place. "ring" blends each island
+    with its predecessor's trail; "mean" pulls every island toward the average.
+    """
+    if migration == "ring":
+        field[:] = (1 - rate) * field + rate * np.roll(field, 1, axis=0)
+    elif migration == "mean":
+        field[:] = (1 - rate) * field + rate * field.mean(axis=0)
+    else:
+        raise ValueError(f"unknown migration scheme: {migration}")
+
+def island_colony_path(nodes, edges, source, sink, seeds=(0, 1, 2, 3), n_workers=None,
+                       exchange_every=25, migration="ring", rate=0.5, n_ants=100, n_iter=250,
+                       alpha=1.0, beta=4.0, rho=0.3, Q=100, max_steps=1000, log=True,
+                       heuristic="length", n_candidates=None, callback=None):
+    """
+    Independent colonies (one per seed) run in a process pool and exchange
+    pheromone every `exchange_every` iterations. The (n_islands, n_edges)
+    field lives in shared memory; only generator states and best paths cross
+    process boundaries. Islands own their generator, so for a given seed set
+    the result does not depend on n_workers. `callback(iteration, info)`
+    runs in the calling process after every exchange epoch with
+    best_cost/best_iter/island_costs, `iteration` being the epoch's last.
+    Returns (pheromone dict averaged over islands, best_path, best_cost).
+    """
+    graph = nodes if isinstance(nodes, CSRGraph) else CSRGraph.from_edges(nodes, edges)
+    src, dst = graph.node_id(source), graph.node_id(sink)
+    shape = (len(seeds), graph.n_edges)
+    states = [np.random.default_rng(s).bit_generator.state for s in seeds]
+    params = dict(n_ants=n_ants, alpha=alpha, beta=beta, rho=rho, Q=Q, max_steps=max_steps,
+                  heuristic=heuristic, n_candidates=n_candidates)
+    # workers only need the arrays, not the label list / lookup dict
+    bare = dataclasses.replace(graph, labels=None, xy=None, id_grid=None, _index=None, _padded=None)
+    n_workers = n_workers or min(len(seeds), mp.cpu_count())
+
+    shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+    pool, field = None, None
+    try:
+        field = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        field[:] = 1.0
+        initargs = (shm.name, shape, bare, src, dst, params)
+        if n_workers > 1:
+            pool = mp.get_context().Pool(n_workers, initializer=_island_init, initargs=initargs)
+            run = pool.map
+        else:
+            _island_init(*initargs)
+            run = lambda f, tasks: [f(t) for t in tasks]
+        best_ids, best_cost, best_iter = None, float('inf'), None
+        for start in range(0, n_iter, exchange_every):
+            chunk = min(exchange_every, n_iter - start)
+            results = run(_island_epoch, [(k, chunk, states[k]) for k in range(len(seeds))])
+            for k, (ids, cost, state) in enumerate(results):
+                states[k] = state
+                if cost < best_cost:
+                    best_ids, best_cost, best_iter = ids, cost, start + chunk - 1
+            if start + chunk < n_iter:
+                exchange_pheromone(field, migration, rate)
+            if callback is not None:
+                callback(start + chunk - 1, dict(best_cost=best_cost, best_iter=best_iter,
+                                                 island_costs=[r[1] for r in results]))
+            if log:
+                print(f"Iter {start + chunk:3d} | best = {best_cost:.2f} | "
+                      f"island bests = {[round(r[1], 2) for r in results]}")
+        pheromone = field.mean(axis=0)
+    finally:
+        if pool is not None:
+            pool.close(); pool.join()
+        # views into the block must go before it can be closed
+        field = None
+        local = _island.pop('shm', None)
+        _island.clear()
+        if local is not None:
+            local.close()
+        shm.close(); shm.unlink()
+    best_path = graph.path_labels(best_ids) if best_ids is not None else None
+    return graph.edge_dict(pheromone), best_path, best_cost
@@ -0,0 +1,294 @@
+# bench_solvers.py
+"""
+Benchmarks for the ACO, Physarum and GA solvers over a ladder of grid and
+city sizes with fixed seeds. Every case runs in a fresh process so its peak
+RSS is its own; results go to a JSON file that a later run can be compared
+against to catch regressions in time, memory or solution quality.
+
+    python bench_solvers.py --out bench_results.json
+    python bench_solvers.py --out new.json --compare bench_results.json
+    python bench_solvers.py --only aco physarum --quick
+"""
+import argparse
+import json
+import multiprocessing as mp
+import os
+import platform
+import random
+import resource
+import subprocess
+import sys
+import time
+from importlib.machinery import SourceFileLoader
+from importlib.util import module_from_spec, spec_from_loader
+
+import numpy as np
+
+os.environ.setdefault("MPLBACKEND", "Agg")   # the solver scripts import pyplot; keep it headless
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# solver -> rungs of the scaling ladder; each rung is one case
+LADDERS = {
+    "aco": [dict(width=28, height=16), dict(width=56, height=32), dict(width=112, height=64)],
+    "aco_dict": [dict(width=28, height=16), dict(width=56, height=32)],
+    "physarum": [dict(width=30, height=18), dict(width=60, height=36), dict(width=120, height=72)],
+    "ga": [dict(n_demands=30), dict(n_demands=100), dict(n_demands=300)],
+    "evaluate": [dict(n_demands=100), dict(n_demands=300), dict(n_demands=1000)],
+}
+# quality keys checked by --compare; the rest are informational
+LOWER_IS_BETTER = {"cost_ratio", "best_fitness", "unserved", "mean_fitness"}
+HIGHER_IS_BETTER = {"success_rate"}
+
+# ---------------------------------------
+# Loading the extension-less solver scripts
+# ---------------------------------------
+def load_script(name):
+    """Import one of the solver scripts (no .py suffix) as a module named `name`."""
+    if name in sys.modules:
+        return sys.modules[name]
+    if HERE not in sys.path:
+        sys.path.insert(0, HERE)
+    loader = SourceFileLoader(name, os.path.join(HERE, name))
+    module = module_from_spec(spec_from_loader(name, loader))
+    sys.modules[name] = module   # registered first so worker processes can unpickle its functions
+    loader.exec_module(module)
+    return module
+
+class Recorder:
+    """Per-iteration callback for the solvers: keeps the info dicts and their timestamps."""
+    def __init__(self):
+        self.t0 = time.perf_counter()
+        self.trace = []
+
+    def __call__(self, iteration, info):
+        self.trace.append(dict(info, iteration=iteration, t=time.perf_counter() - self.t0))
+
+# ---------------------------------------
+# Cases: setup (untimed) -> solve (timed) -> quality
+# ---------------------------------------
+def _grid(width, height, seed):
+    from csr_graph import make_complex_grid, grid_graph
+    random.seed(seed)
+    blocked = make_complex_grid(width, height, density=0.25, corridor_bias=0.7)
+    source, sink = (1, 1), (width - 2, height - 2)
+    blocked[source[1], source[0]] = blocked[sink[1], sink[0]] = False
+    graph = grid_graph(width, height, blocked, diag=True, as_graph=True)
+    optimum = graph.dijkstra(graph.node_id(source))[graph.node_id(sink)]
+    return graph, source, sink, optimum
+
+def case_aco(width, height, seed, engine="vectorized", n_ants=40, n_iter=40):
+    aco = load_script("Ant_Colony_Optimisation_V1")
+    graph, source, sink, optimum = _grid(width, height, seed)
+    nodes, edges = graph.to_lists()
+    rec = Recorder()
+
+    def solve():
+        random.seed(seed)
+        rec.t0 = time.perf_counter()
+        return aco.ant_colony_path(nodes, edges, source, sink, n_ants=n_ants, n_iter=n_iter, beta=5.0,
+                                   engine=engine, log_every=0, callback=rec)
+
+    def quality(result):
+        _, path, cost = result
+        found = bool(path) and np.isfinite(cost)
+        return dict(best_cost=float(cost) if found else None, cost_ratio=float(cost / optimum) if found else None,
+                    path_len=len(path) if found else 0, best_iter=rec.trace[-1]["best_iter"],
+                    success_rate=sum(r["n_ok"] for r in rec.trace) / sum(r["n_ants"] for r in rec.trace))
+    return solve, quality, rec, dict(nodes=graph.n_nodes, edges=graph.n_edges, n_ants=n_ants, n_iter=n_iter)
+
+def case_aco_dict(width, height, seed):
+    return case_aco(width, height, seed, engine="dict", n_iter=20)
+
+def case_physarum(width, height, seed, iters=1000):
+    phy = load_script("Mycelium_Network_V1")
+    graph, source, sink, optimum = _grid(width, height, seed)
+    nodes, edges = graph.to_lists()
+    rec = Recorder()
+
+    def solve():
+        rec.t0 = time.perf_counter()
+        return phy.physarum_solver(nodes, edges, source, sink, iters=iters, dt=0.25, decay=0.1, solver="cg",
+                                   tol=1e-4, prune=1e-4, return_info=True, callback=rec)
+
+    def quality(result):
+        D, info = result
+        path = phy.strongest_path(nodes, edges, D, source, sink)
+        cost = float(sum(np.hypot(b[0] - a[0], b[1] - a[1]) for a, b in zip(path, path[1:]))) if path else None
+        return dict(path_cost=cost, cost_ratio=cost / optimum if path else None, final_change=info["changes"][-1],
+                    active_edges=info["active_edges"][-1], solver_iters=info["solver_iters"])
+    return solve, quality, rec, dict(nodes=graph.n_nodes, edges=graph.n_edges, iters=iters)
+
+def _city(n_demands, seed):
+    ga = load_script("Genetic_Algorithm_V1")
+    random.seed(seed)
+    nodes, edges = ga.generate_city(n_demands=n_demands, n_substations=max(3, n_demands // 30),
+                                    substation_supply=max(100.0, 6.0 * n_demands))
+    return ga, nodes, edges
+
+def case_ga(n_demands, seed, pop_size=40, gens=20):
+    ga, nodes, edges = _city(n_demands, seed)
+    rec = Recorder()
+
+    def solve():
+        rec.t0 = time.perf_counter()
+        return ga.run_ga(nodes, edges, pop_size=pop_size, gens=gens, seed=seed, log_every=0, callback=rec)
+
+    def quality(history):
+        fit, rep, _, _ = ga.evaluate(nodes, edges, np.unpackbits(history[-1], count=len(edges)))
+        return dict(best_fitness=float(fit), unserved=rep["unserved"], build=rep["build"], loss=rep["loss"])
+    return solve, quality, rec, dict(nodes=len(nodes), edges=len(edges), pop_size=pop_size, gens=gens)
+
+def case_evaluate(n_demands, seed, n_genomes=50):
+    ga, nodes, edges = _city(n_demands, seed)
+    genomes = np.random.default_rng(seed).random((n_genomes, len(edges))) < 0.5
+    ga.city_arrays(nodes, edges)   # the per-city arrays are built once and memoised; keep that out of the timing
+    rec = Recorder()
+
+    def solve():
+        rec.t0 = time.perf_counter()
+        out = []
+        for i, bits in enumerate(genomes):
+            out.append(ga.evaluate(nodes, edges, bits)[:2])
+            rec(i, dict(fitness=out[-1][0]))
+        return out
+
+    def quality(results):
+        return dict(mean_fitness=float(np.mean([f for f, _ in results])),
+                    per_eval_ms=1e3 * rec.trace[-1]["t"] / len(rec.trace))
+    return solve, quality, rec, dict(nodes=len(nodes), edges=len(edges), n_genomes=n_genomes)
+
+CASES = {"aco": case_aco, "aco_dict": case_aco_dict, "physarum": case_physarum,
+         "ga": case_ga, "evaluate": case_evaluate}
+
+# ---------------------------------------
+# Running
+# ---------------------------------------
+def _rss_mb():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024   # kB on Linux
+
+def _run_case(solver, params, seed, queue):
+    try:
+        solve, quality, rec, size = CASES[solver](**params, seed=seed)
+        base = _rss_mb()
+        t0 = time.perf_counter()
+        result = solve()
+        wall = time.perf_counter() - t0
+        peak = _rss_mb()
+        q = quality(result)
+        queue.put(dict(wall_s=wall, peak_rss_mb=peak, solve_rss_mb=max(0.0, peak - base),
+                       iterations=len(rec.trace), size=size, quality=q,
+                       trace=[{k: v for k, v in r.items() if isinstance(v, (int, float)) or v is None}
+                              for r in rec.trace]))
+    except Exception as e:   # reported as a failed case instead of hanging the parent
+        queue.put(dict(error=f"{type(e).__name__}: {e}"))
+
+def run_case(solver, params, seed=0, repeat=1, timeout=1800):
+    """One ladder rung in `repeat` fresh processes; keeps the fastest run's figures."""
+    ctx = mp.get_context("spawn")
+    best = None
+    for _ in range(repeat):
+        queue = ctx.Queue()
+        proc = ctx.Process(target=_run_case, args=(solver, params, seed, queue))
+        proc.start()
+        try:
+            res = queue.get(timeout=timeout)
+        except Exception:
+            res = dict(error=f"no result within {timeout}s")
+        proc.join(5)
+        if proc.is_alive():
+            proc.terminate()
+        if "error" in res:
+            return res
+        if best is None or res["wall_s"] < best["wall_s"]:
+            best = res
+    return best
+
+def _environment():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=HERE, capture_output=True,
+                                text=True, timeout=10).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return dict(commit=commit, python=platform.python_version(), numpy=np.__version__,
+                machine=platform.machine(), cpus=os.cpu_count(),
+                timestamp=time.strftime("%Y-%m-%dT%H:%M:%S"))
+
+def run_suite(only=None, quick=False, seed=0, repeat=1, keep_trace=False):
+    results = []
+    for solver, ladder in LADDERS.items():
+        if only and solver not in only:
+            continue
+        for params in ladder[:1] if quick else ladder:
+            res = run_case(solver, params, seed, repeat)
+            if not keep_trace:
+                res.pop("trace", None)
+            results.append(dict(solver=solver, params=params, seed=seed, **res))
+            if "error" in res:
+                print(f"{solver:9s} {_case_name(params):14s} FAILED {res['error']}")
+            else:
+                q = ", ".join(f"{k}={v:.4g}" for k, v in res["quality"].items() if isinstance(v, (int, float)))
+                print(f"{solver:9s} {_case_name(params):14s} {res['wall_s']:8.3f}s  "
+                      f"{res['solve_rss_mb']:7.1f} MB  {res['iterations']:5d} it  {q}")
+    return dict(environment=_environment(), results=results)
+
+# ---------------------------------------
+# Regression check
+# ---------------------------------------
+def _case_name(params):
+    return "x".join(str(v) for v in params.values())
+
+def compare(current, baseline, time_tol=0.25, mem_tol=0.25, quality_tol=0.01, min_time=0.5):
+    """
+    Regressions of `current` against `baseline` (both results dicts): cases
+    slower than (1 + time_tol) x baseline (ignored under `min_time` seconds),
+    using more than (1 + mem_tol) x the solve memory, or with a quality
+    figure worse by more than quality_tol relative (or no longer found).
+    """
+    base = {(r["solver"], json.dumps(r["params"], sort_keys=True), r["seed"]): r for r in baseline["results"]}
+    regressions = []
+    for r in current["results"]:
+        b = base.get((r["solver"], json.dumps(r["params"], sort_keys=True), r["seed"]))
+        if b is None or "error" in b:
+            continue
+        name = f"{r['solver']} {_case_name(r['params'])}"
+        if "error" in r:
+            regressions.append(f"{name}: failed ({r['error']})")
+            continue
+        if r["wall_s"] > (1 + time_tol) * b["wall_s"] and r["wall_s"] > min_time:
+            regressions.append(f"{name}: time {b['wall_s']:.3f}s -> {r['wall_s']:.3f}s")
+        if r["solve_rss_mb"] > (1 + mem_tol) * b["solve_rss_mb"] + 1.0:
+            regressions.append(f"{name}: memory {b['solve_rss_mb']:.1f} MB -> {r['solve_rss_mb']:.1f} MB")
+        for key in (LOWER_IS_BETTER | HIGHER_IS_BETTER) & r["quality"].keys() & b["quality"].keys():
+            new, old = r["quality"][key], b["quality"][key]
+            if old is None:
+                continue
+            sign = -1 if key in HIGHER_IS_BETTER else 1
+            if new is None or sign * (new - old) > quality_tol * abs(old):   # None: no solution found
+                regressions.append(f"{name}: {key} {old:.4g} -> {new if new is None else format(new, '.4g')}")
+    return regressions
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--out", default="bench_results.json")
+    ap.add_argument("--compare", metavar="BASELINE_JSON")
+    ap.add_argument("--only", nargs="+", choices=list(LADDERS))
+    ap.add_argument("--quick", action="store_true", help="first rung of each ladder only")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--repeat", type=int, default=3, help="runs per case; the fastest is kept")
+    ap.add_argument("--trace", action="store_true", help="keep the per-iteration callback trace")
+    ap.add_argument("--time-tol", type=float, default=0.25)
+    ap.add_argument("--mem-tol", type=float, default=0.25)
+    ap.add_argument("--quality-tol", type=float, default=0.01)
+    args = ap.parse_args()
+
+    current = run_suite(args.only, args.quick, args.seed, args.repeat, args.trace)
+    with open(args.out, "w") as f:
+        json.dump(current, f, indent=2)
+    print(f"results -> {args.out}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(current, json.load(f), args.time_tol, args.mem_tol, args.quality_tol)
+        for line in regressions:
+            print("REGRESSION", line)
+        print(f"{len(regressions)} regressions against {args.compare}")
+        sys.exit(1 if regressions else 0)
@@ -0,0 +1,232 @@
+# csr_graph.py
+import random
+import numpy as np
+from heapq import heappush, heappop
+from dataclasses import dataclass, field
+from typing import Optional
+
+# (dx, dy) steps that go "forward" from a cell, i.e. (x,y) < (x+dx, y+dy);
+# the first two are the 4-neighbourhood, all four the 8-neighbourhood.
+GRID_OFFSETS = [(1, 0), (0, 1), (1, 1), (1, -1)]
+
+# ---------------------------------------
+# Array-backed undirected graph
+# ---------------------------------------
+@dataclass
+class CSRGraph:
+    """
+    Undirected graph with integer node ids stored as CSR arrays.
+    Every undirected edge e=(edge_u[e], edge_v[e]) owns two slots in `indices`
+    (one per direction); `slot_edge` maps a slot back to its edge id so
+    per-edge arrays (length, pheromone, conductance) can be gathered per slot.
+    """
+    indptr: np.ndarray              # (n+1,) slot offsets per node
+    indices: np.ndarray             # (2m,) neighbour node id per slot
+    slot_edge: np.ndarray           # (2m,) undirected edge id per slot
+    edge_u: np.ndarray              # (m,)
+    edge_v: np.ndarray              # (m,)
+    length: np.ndarray              # (m,) edge lengths
+    labels: Optional[list] = None   # original node labels, e.g. (x,y) tuples
+    xy: Optional[np.ndarray] = field(default=None, repr=False)       # (n,2) cell coords of grid graphs
+    id_grid: Optional[np.ndarray] = field(default=None, repr=False)  # (h,w) node id per cell, -1 if blocked
+    _index: Optional[dict] = field(default=None, repr=False)
+    _padded: Optional[tuple] = field(default=None, repr=False)
+
+    @property
+    def n_nodes(self):
+        return len(self.indptr) - 1
+
+    @property
+    def n_edges(self):
+        return len(self.edge_u)
+
+    @classmethod
+    def from_edges(cls, nodes, edges, length=None):
+        """
+        Build from the `(nodes, edges)` lists produced by `grid_graph`.
+        Lengths default to the euclidean distance between (x,y) node labels.
+        """
+        index = {n: i for i, n in enumerate(nodes)}
+        m = len(edges)
+        eu = np.fromiter((index[u] for u, _ in edges), dtype=np.int64, count=m)
+        ev = np.fromiter((index[v] for _, v in edges), dtype=np.int64, count=m)
+        if length is None:
+            xy = np.asarray(nodes, dtype=float).reshape(len(nodes), -1)
+            length = np.hypot(*(xy[ev] - xy[eu]).T)
+        g = cls.from_arrays(len(nodes), eu, ev, np.asarray(length, dtype=float), labels=list(nodes))
+        g._index = index
+        return g
+
+    @classmethod
+    def from_arrays(cls, n_nodes, edge_u, edge_v, length, labels=None):
+        """Build from integer edge endpoint arrays."""
+        m = len(edge_u)
+        src = np.concatenate([edge_u, edge_v])
+        dst = np.concatenate([edge_v, edge_u])
+        eid = np.concatenate([np.arange(m), np.arange(m)])
+        order = np.argsort(src, kind='stable')
+        indptr = np.zeros(n_nodes + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n_nodes), out=indptr[1:])
+        return cls(indptr, dst[order], eid[order], np.asarray(edge_u), np.asarray(edge_v),
+                   np.asarray(length, dtype=float), labels)
+
+    @classmethod
+    def from_mask(cls, mask, diag=False):
+        """
+        Grid graph over the open cells of a boolean (height, width) mask.
+        Node ids run row-major over open cells and edges are ordered by source
+        node, then by GRID_OFFSETS; labels are (x,y) tuples, materialised only
+        when asked for.
+        """
+        mask = np.asarray(mask, dtype=bool)
+        h, w = mask.shape
+        id_grid = np.full((h, w), -1, dtype=np.int64)
+        cells = np.flatnonzero(mask)
+        id_grid.flat[cells] = np.arange(len(cells))
+        ys, xs = np.divmod(cells, w)
+        offsets = GRID_OFFSETS[:4] if diag else GRID_OFFSETS[:2]
+        # (n, k) table of forward neighbours; raveling it row-major gives edges
+        # grouped by source node, then by offset
+        nbr = np.full((len(cells), len(offsets)), -1, dtype=np.int64)
+        for k, (dx, dy) in enumerate(offsets):
+            nx, ny = xs + dx, ys + dy
+            ok = np.flatnonzero((nx >= 0) & (nx < w) & (ny >= 0) & (ny < h))
+            nbr[ok, k] = id_grid[ny[ok], nx[ok]]
+        flat = np.flatnonzero(nbr.ravel() >= 0)
+        eu, kind = np.divmod(flat, len(offsets))
+        ev = nbr.ravel()[flat]
+        del nbr, flat
+        steps = np.hypot(*np.array(offsets, dtype=float).T)
+        g = cls.from_arrays(len(cells), eu, ev, steps[kind])
+        g.xy = np.column_stack([xs, ys])
+        g.id_grid = id_grid
+        return g
+
+    def _labels(self):
+        if self.labels is None and self.xy is not None:
+            self.labels = list(map(tuple, self.xy.tolist()))
+        return self.labels
+
+    def node_id(self, label):
+        if self.id_grid is not None:
+            x, y = label
+            i = self.id_grid[y, x] if 0 <= y < self.id_grid.shape[0] and 0 <= x < self.id_grid.shape[1] else -1
+            if i < 0:
+                raise KeyError(label)
+            return int(i)
+        if self._index is None:
+            self._index = {n: i for i, n in enumerate(self.labels)}
+        return self._index[label]
+
+    def label(self, i):
+        return self._labels()[i]
+
+    def path_labels(self, ids):
+        labels = self._labels()
+        return [labels[i] for i in ids]
+
+    def to_lists(self):
+        """(nodes, edges) label lists, the form the dict-based solvers take."""
+        labels = self._labels()
+        return labels, [(labels[u], labels[v]) for u, v in zip(self.edge_u.tolist(), self.edge_v.tolist())]
+
+    def degree(self):
+        return np.diff(self.indptr)
+
+    def dijkstra(self, source):
+        """Shortest-path distance from node id `source` to every node (inf if unreachable)."""
+        indptr = self.indptr.tolist()
+        nbrs = self.indices.tolist()
+        w = self.length[self.slot_edge].tolist()
+        dist = [float('inf')] * self.n_nodes
+        dist[source] = 0.0
+        pq = [(0.0, source)]
+        while pq:
+            d, u = heappop(pq)
+            if d != dist[u]:
+                continue
+            for k in range(indptr[u], indptr[u + 1]):
+                nd = d + w[k]
+                v = nbrs[k]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    heappush(pq, (nd, v))
+        return np.array(dist)
+
+    def padded(self):
+        """
+        Fixed-width neighbour table: (nbr, edge), both (n, max_degree) with -1
+        where a node has fewer neighbours. Lets a whole batch of walkers look up
+        their options with one fancy-index.
+        """
+        if self._padded is None:
+            deg = self.degree()
+            width = max(int(deg.max()) if len(deg) else 0, 1)
+            owner = np.repeat(np.arange(self.n_nodes), deg)
+            pos = np.arange(len(self.indices)) - self.indptr[owner]
+            nbr = np.full((self.n_nodes, width), -1, dtype=np.int64)
+            edge = np.full((self.n_nodes, width), -1, dtype=np.int64)
+            nbr[owner, pos] = self.indices
+            edge[owner, pos] = self.slot_edge
+            self._padded = (nbr, edge)
+        return self._padded
+
+    def edge_dict(self, values):
+        """Per-edge array -> {(u,v): x, (v,u): x} keyed by node labels, as the dict solvers return."""
+        out = {}
+        labels = self._labels()
+        for u, v, x in zip(self.edge_u.tolist(), self.edge_v.tolist(), np.asarray(values).tolist()):
+            a, b = labels[u], labels[v]
+            out[(a, b)] = x
+            out[(b, a)] = x
+        return out
+
+    def edge_array(self, values, default=0.0):
+        """Inverse of `edge_dict`: {(u,v): x} keyed by labels -> per-edge array."""
+        out = np.full(self.n_edges, default, dtype=float)
+        labels = self._labels()
+        for e, (u, v) in enumerate(zip(self.edge_u.tolist(), self.edge_v.tolist())):
+            key = (labels[u], labels[v])
+            if key in values:
+                out[e] = values[key]
+            elif key[::-1] in values:
+                out[e] = values[key[::-1]]
+        return out
+
+
+# ---------------------------------------
+# Grids from boolean masks
+# ---------------------------------------
+def make_complex_grid(width, height, density=0.25, corridor_bias=0.6):
+    """
+    Maze-like blocked-cell mask (height, width): cells are blocked with
+    probability density*(1-corridor_bias), leaving corridors open. Draws its
+    generator from `random`, so random.seed keeps mazes repeatable.
+    """
+    rng = np.random.default_rng(random.getrandbits(64))
+    return (rng.random((height, width)) < density) & (rng.random((height, width)) > corridor_bias)
+
+def obstacle_mask(width, height, obstacles=None):
+    """Blocked-cell mask (height, width) from a set of (x,y) cells or an existing mask."""
+    if isinstance(obstacles, np.ndarray):
+        return obstacles.astype(bool)
+    blocked = np.zeros((height, width), dtype=bool)
+    if obstacles:
+        xy = np.array([c for c in obstacles if 0 <= c[0] < width and 0 <= c[1] < height], dtype=np.int64)
+        if len(xy):
+            blocked[xy[:, 1], xy[:, 0]] = True
+    return blocked
+
+def obstacle_cells(obstacles):
+    """(k,2) array of blocked (x,y) cells, for scatter plots."""
+    if isinstance(obstacles, np.ndarray):
+        return np.argwhere(obstacles)[:, ::-1]
+    return np.array(sorted(obstacles), dtype=np.int64).reshape(-1, 2)
+
+def grid_graph(width, height, obstacles=None, diag=False, as_graph=False):
+    """
+    Grid over the cells not in `obstacles` (a set of (x,y) or a blocked mask).
+    Returns (nodes, edges) label lists, or the CSRGraph with `as_graph=True`.
+    """
+    g = CSRGraph.from_mask(~obstacle_mask(width, height, obstacles), diag)
+    return g if as_graph else g.to_lists()
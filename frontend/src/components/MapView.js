@@ -1,6 +1,7 @@
 import React from 'react';
 import { MapContainer, TileLayer, ZoomControl } from 'react-leaflet';
 import { Box } from '@mui/material';
+import TransitGapLayer from './map/TransitGapLayer';
 
 function MapView() {
   const center = [40.7128, -74.006]; // NYC coordinates
@@ -29,6 +30,7 @@ function MapView() {
           attribution='&copy; <a href="https://www.openstreetmap.org/copyright">OpenStreetMap</a> contributors'
           url="https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png"
         />
+        <TransitGapLayer />
         <ZoomControl position="topright" />
       </MapContainer>
     </Box>
@@ -10,10 +10,12 @@ function LineChart({ data, width = 600, height = 300, margin = { top: 20, right:
     // Clear any existing SVG
     d3.select(svgRef.current).selectAll('*').remove();
 
-    // Create scales
-    const x = d3.scaleTime()
-      .domain(d3.extent(data, d => d.date))
-      .range([margin.left, width - margin.right]);
+    // Create scales: dated points on a time axis, labelled ones (e.g. days of the week) as categories
+    const categorical = !(data[0].date instanceof Date);
+    const x = categorical
+      ? d3.scalePoint().domain(data.map(d => d.label)).range([margin.left, width - margin.right]).padding(0.5)
+      : d3.scaleTime().domain(d3.extent(data, d => d.date)).range([margin.left, width - margin.right]);
+    const xOf = d => x(categorical ? d.label : d.date);
 
     const y = d3.scaleLinear()
       .domain([0, d3.max(data, d => d.value)])
@@ -32,7 +34,7 @@ function LineChart({ data, width = 600, height = 300, margin = { top: 20, right:
       .attr('stroke', '#1976d2')
       .attr('stroke-width', 2)
       .attr('d', d3.line()
-        .x(d => x(d.date))
+        .x(xOf)
         .y(d => y(d.value))
       );
 
@@ -40,7 +42,7 @@ function LineChart({ data, width = 600, height = 300, margin = { top: 20, right:
     svg.selectAll('circle')
       .data(data)
       .join('circle')
-      .attr('cx', d => x(d.date))
+      .attr('cx', xOf)
       .attr('cy', d => y(d.value))
       .attr('r', 4)
       .attr('fill', '#1976d2');
@@ -70,7 +72,7 @@ function LineChart({ data, width = 600, height = 300, margin = { top: 20, right:
         tooltip.transition()
           .duration(200)
           .style('opacity', .9);
-        tooltip.html(`Date: ${d.date.toLocaleDateString()}<br/>Value: ${d.value}`)
+        tooltip.html(`${categorical ? d.label : `Date: ${d.date.toLocaleDateString()}`}<br/>Value: ${d.value}`)
           .style('left', (event.pageX + 10) + 'px')
           .style('top', (event.pageY - 28) + 'px');
       })
@@ -0,0 +1,93 @@
+import React, { useCallback, useEffect, useRef, useState } from 'react';
+import { GeoJSON, useMapEvents } from 'react-leaflet';
+import * as d3 from 'd3';
+import { analysisApi } from '../../services/analysisApi';
+
+// gap > 0: denser than it is served (red); gap < 0: well served for its density (green)
+const gapColor = d3.scaleDiverging(d3.interpolateRdYlGn).domain([1, 0, -1]);
+
+const clampTile = (t, z) => Math.max(0, Math.min(2 ** z - 1, t));
+const lonToTile = (lon, z) => clampTile(Math.floor(((lon + 180) / 360) * 2 ** z), z);
+const latToTile = (lat, z) => {
+  const rad = (Math.max(-85.05, Math.min(85.05, lat)) * Math.PI) / 180;
+  return clampTile(Math.floor(((1 - Math.log(Math.tan(rad) + 1 / Math.cos(rad)) / Math.PI) / 2) * 2 ** z), z);
+};
+
+const style = (feature) => ({
+  fillColor: feature.properties.gap == null ? '#9e9e9e' : gapColor(feature.properties.gap),
+  fillOpacity: 0.55,
+  color: '#424242',
+  weight: 0.5,
+  stroke: !feature.properties.clipped // tile edges of clipped pieces are not tract borders
+});
+
+const onEachFeature = (feature, layer) => {
+  const p = feature.properties;
+  layer.bindTooltip(
+    `<strong>${p.geoid}</strong><br/>Gap score: ${p.gap ?? 'n/a'}<br/>Residents: ${p.pop.toLocaleString()}` +
+    `<br/>Stops: ${p.n_stops}, weekday departures: ${p.weekday_departures ?? 0}` +
+    `<br/>Avg transit commute: ${p.avg_minutes_pt ?? 'n/a'} min`,
+    { sticky: true }
+  );
+};
+
+// Tract-level transit gaps from the pre-generated tiles of the analysis API.
+// Panning only requests the tiles in view; tiles already loaded are reused.
+function TransitGapLayer() {
+  const [meta, setMeta] = useState(null);
+  const [features, setFeatures] = useState(null);
+  const latest = useRef(0);
+
+  const load = useCallback(async (map) => {
+    if (!meta) return;
+    const request = ++latest.current;
+    const z = map.getZoom();
+    if (z < meta.minzoom) {
+      setFeatures(null);
+      return;
+    }
+    const tz = Math.min(z, meta.maxzoom);
+    const bounds = map.getBounds();
+    const requests = [];
+    for (let x = lonToTile(bounds.getWest(), tz); x <= lonToTile(bounds.getEast(), tz); x++) {
+      for (let y = latToTile(bounds.getNorth(), tz); y <= latToTile(bounds.getSouth(), tz); y++) {
+        requests.push(analysisApi.getTile(tz, x, y).catch(() => null));
+      }
+    }
+    const tiles = await Promise.all(requests);
+    if (request !== latest.current) return; // a newer pan has started
+    // tracts spanning a few tiles are stored whole in each of them: keep one copy per geoid
+    const seen = new Set();
+    const merged = [];
+    tiles.forEach((tile) => {
+      tile?.features.forEach((f) => {
+        if (f.properties.clipped) {
+          merged.push(f);
+        } else if (!seen.has(f.properties.geoid)) {
+          seen.add(f.properties.geoid);
+          merged.push(f);
+        }
+      });
+    });
+    setFeatures({ key: `${tz}:${bounds.toBBoxString()}`, data: { type: 'FeatureCollection', features: merged } });
+  }, [meta]);
+
+  const map = useMapEvents({
+    moveend: () => load(map)
+  });
+
+  useEffect(() => {
+    analysisApi.getTilesMeta().then(setMeta).catch((error) => {
+      console.warn('Transit gap tiles unavailable:', error);
+    });
+  }, []);
+
+  useEffect(() => {
+    load(map);
+  }, [load, map]);
+
+  if (!features) return null;
+  return <GeoJSON key={features.key} data={features.data} style={style} onEachFeature={onEachFeature} />;
+}
+
+export default TransitGapLayer;
@@ -6,7 +6,7 @@ import LineChart from '../charts/LineChart';
 import DonutChart from '../charts/DonutChart';
 import { analysisApi } from '../../services/analysisApi';
 
-// Mock data - replace with API calls later
+// Shown until the first API response arrives
 const mockMetrics = {
   accessibility: { value: '78%', trend: { direction: 'up', value: '+5% from last month' } },
   coverage: { value: '65%', trend: { direction: 'up', value: '+2% from last month' } },
@@ -15,7 +15,6 @@ const mockMetrics = {
 };
 
 function AnalysisView() {
-  const [timeframe, setTimeframe] = useState('month');
   const [region, setRegion] = useState('all');
   const [metrics, setMetrics] = useState(mockMetrics);
   const [trendsData, setTrendsData] = useState([]);
@@ -25,8 +24,8 @@ function AnalysisView() {
     const fetchData = async () => {
       try {
         const [metricsData, trends, distribution] = await Promise.all([
-          analysisApi.getMetrics(timeframe, region),
-          analysisApi.getTrends({ timeframe, region }),
+          analysisApi.getMetrics(region),
+          analysisApi.getTrends({ region }),
           analysisApi.getImpactDistribution({ region })
         ]);
 
@@ -39,7 +38,7 @@ function AnalysisView() {
     };
 
     fetchData();
-  }, [timeframe, region]);
+  }, [region]);
 
   return (
     <Box sx={{ p: 3, height: '100%', overflow: 'auto' }}>
@@ -48,19 +47,6 @@ function AnalysisView() {
         <Box sx={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', mb: 3 }}>
           <Typography variant="h4">Transit Analysis</Typography>
           <Box sx={{ display: 'flex', gap: 2 }}>
-            <FormControl size="small" sx={{ minWidth: 120 }}>
-              <InputLabel>Timeframe</InputLabel>
-              <Select
-                value={timeframe}
-                label="Timeframe"
-                onChange={(e) => setTimeframe(e.target.value)}
-              >
-                <MenuItem value="week">Week</MenuItem>
-                <MenuItem value="month">Month</MenuItem>
-                <MenuItem value="quarter">Quarter</MenuItem>
-                <MenuItem value="year">Year</MenuItem>
-              </Select>
-            </FormControl>
             <FormControl size="small" sx={{ minWidth: 120 }}>
               <InputLabel>Region</InputLabel>
               <Select
@@ -69,9 +55,9 @@ function AnalysisView() {
                 onChange={(e) => setRegion(e.target.value)}
               >
                 <MenuItem value="all">All Regions</MenuItem>
-                <MenuItem value="north">North</MenuItem>
+                <MenuItem value="northeast">Northeast</MenuItem>
+                <MenuItem value="midwest">Midwest</MenuItem>
                 <MenuItem value="south">South</MenuItem>
-                <MenuItem value="east">East</MenuItem>
                 <MenuItem value="west">West</MenuItem>
               </Select>
             </FormControl>
@@ -83,33 +69,33 @@ function AnalysisView() {
           <Grid item xs={12} sm={6} md={3}>
             <MetricCard
               title="Transit Accessibility Score"
-              value={mockMetrics.accessibility.value}
+              value={metrics.accessibility.value}
               description="Overall accessibility rating based on coverage and frequency"
-              trend={mockMetrics.accessibility.trend}
+              trend={metrics.accessibility.trend}
             />
           </Grid>
           <Grid item xs={12} sm={6} md={3}>
             <MetricCard
               title="Area Coverage"
-              value={mockMetrics.coverage.value}
+              value={metrics.coverage.value}
               description="Percentage of urban area with transit access"
-              trend={mockMetrics.coverage.trend}
+              trend={metrics.coverage.trend}
             />
           </Grid>
           <Grid item xs={12} sm={6} md={3}>
             <MetricCard
               title="Population Impact"
-              value={mockMetrics.impact.value}
+              value={metrics.impact.value}
               description="Number of residents served by transit"
-              trend={mockMetrics.impact.trend}
+              trend={metrics.impact.trend}
             />
           </Grid>
           <Grid item xs={12} sm={6} md={3}>
             <MetricCard
               title="System Efficiency"
-              value={mockMetrics.efficiency.value}
+              value={metrics.efficiency.value}
               description="Overall system performance score"
-              trend={mockMetrics.efficiency.trend}
+              trend={metrics.efficiency.trend}
             />
           </Grid>
         </Grid>
@@ -118,9 +104,9 @@ function AnalysisView() {
         <Grid container spacing={3}>
           <Grid item xs={12} md={8}>
             <AnalysisChart
-              title="Accessibility Trends"
-              description="Historical view of transit accessibility scores"
-              tags={['Accessibility', 'Historical', 'Trends']}
+              title="Service by Day of Week"
+              description="Share of residents with frequent transit service on each day of the service week"
+              tags={['Accessibility', 'Frequency', 'Weekly profile']}
             >
               <Box sx={{ height: '300px', width: '100%' }}>
                 <LineChart
@@ -1,28 +1,69 @@
 // API configuration
 const API_BASE_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000/api';
 
+// Responses carry ETag + Cache-Control, so the browser revalidates them itself (304s, no body)
+const getJson = async (path, params = {}) => {
+  const query = new URLSearchParams(params).toString();
+  const response = await fetch(`${API_BASE_URL}${path}${query ? `?${query}` : ''}`);
+  if (!response.ok) {
+    throw new Error(`${path} failed with HTTP ${response.status}`);
+  }
+  return response.json();
+};
+
+// Tiles never change for a given build, so each one is fetched at most once per page load
+const tileCache = new Map();
+
 // Analysis endpoints
 export const analysisApi = {
   // Get overall transit metrics
-  getMetrics: async (timeframe = 'month', region = 'all') => {
-    // TODO: Replace with actual API call
-    return mockMetricsResponse;
+  getMetrics: async (region = 'all') => {
+    try {
+      return await getJson('/metrics', { region });
+    } catch (error) {
+      console.warn('Analysis API unavailable, using mock metrics:', error);
+      return mockMetricsResponse;
+    }
   },
 
-  // Get accessibility trends data
-  getTrends: async (params) => {
-    // TODO: Replace with actual API call
-    return mockTrendsResponse;
+  // Share of residents with frequent service on each day of the service week
+  getTrends: async ({ region = 'all' } = {}) => {
+    try {
+      const trends = await getJson('/trends', { region });
+      return { data: trends.data.map((d) => ({ label: d.day, value: d.value })) };
+    } catch (error) {
+      console.warn('Analysis API unavailable, using mock trends:', error);
+      return mockTrendsResponse;
+    }
   },
 
   // Get impact distribution data
-  getImpactDistribution: async (params) => {
-    // TODO: Replace with actual API call
-    return mockDistributionResponse;
+  getImpactDistribution: async ({ region = 'all' } = {}) => {
+    try {
+      return await getJson('/distribution', { region });
+    } catch (error) {
+      console.warn('Analysis API unavailable, using mock distribution:', error);
+      return mockDistributionResponse;
+    }
+  },
+
+  // Zoom range and bounds of the transit-gap tiles
+  getTilesMeta: async () => getJson('/tiles.json'),
+
+  // One GeoJSON tile of the transit-gap layer
+  getTile: (z, x, y) => {
+    const key = `${z}/${x}/${y}`;
+    if (!tileCache.has(key)) {
+      tileCache.set(key, getJson(`/tiles/${key}.json`).catch((error) => {
+        tileCache.delete(key);
+        throw error;
+      }));
+    }
+    return tileCache.get(key);
   }
 };
 
-// Mock responses for development
+// Mock responses for development (used when the API is not running)
 const mockMetricsResponse = {
   accessibility: { value: '78%', trend: { direction: 'up', value: '+5% from last month' } },
   coverage: { value: '65%', trend: { direction: 'up', value: '+2% from last month' } },
@@ -32,16 +73,13 @@ const mockMetricsResponse = {
 
 const mockTrendsResponse = {
   data: [
-    { date: new Date('2025-01-01'), value: 65 },
-    { date: new Date('2025-02-01'), value: 68 },
-    { date: new Date('2025-03-01'), value: 70 },
-    { date: new Date('2025-04-01'), value: 72 },
-    { date: new Date('2025-05-01'), value: 75 },
-    { date: new Date('2025-06-01'), value: 73 },
-    { date: new Date('2025-07-01'), value: 76 },
-    { date: new Date('2025-08-01'), value: 78 },
-    { date: new Date('2025-09-01'), value: 77 },
-    { date: new Date('2025-10-01'), value: 78 }
+    { label: 'Mon', value: 62 },
+    { label: 'Tue', value: 63 },
+    { label: 'Wed', value: 63 },
+    { label: 'Thu', value: 63 },
+    { label: 'Fri', value: 61 },
+    { label: 'Sat', value: 44 },
+    { label: 'Sun', value: 37 }
   ]
 };
 
@@ -54,4 +92,4 @@ const mockDistributionResponse = {
   ]
 };
 
-export default analysisApi;
\ No newline at end of file
+export default analysisApi;
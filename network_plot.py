@@ -0,0 +1,80 @@
+# network_plot.py
+"""
+Batched drawing for the solver scripts: a whole edge layer (pheromone, tube
+conductance D, GA candidate edges) is one LineCollection whose per-edge
+colour and width arrays come straight from the edge values, instead of one
+Line2D per edge. With `out` set, figures are built without pyplot and
+written to disk, so batch runs never touch a GUI backend.
+"""
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.animation import FuncAnimation, writers
+from matplotlib.collections import LineCollection
+from matplotlib.colors import to_rgba
+from matplotlib.figure import Figure
+
+# ---------------------------------------
+# Edge layers
+# ---------------------------------------
+def edge_segments(values, edges=None):
+    """
+    (m,2,2) segment array and (m,) values of an edge layer. `values` is the
+    {(u,v): value} dict the solvers return, or an (m,) array aligned with
+    `edges` (a list of ((x1,y1),(x2,y2)) pairs or an (m,2,2) array).
+    """
+    if edges is None:
+        edges, values = list(values), np.fromiter(values.values(), float, len(values))
+    return np.asarray(edges, dtype=float).reshape(-1, 2, 2), np.asarray(values, dtype=float)
+
+def edge_colors(color, alpha, n):
+    """(n,4) RGBA array of one colour with a scalar or per-edge alpha."""
+    rgba = np.tile(to_rgba(color), (n, 1))
+    rgba[:, 3] = alpha
+    return rgba
+
+def edge_layer(ax, segments, color='gray', alpha=1.0, lw=1.0, **kw):
+    """Add one LineCollection for `segments` with scalar or per-edge alpha and lw; returns it."""
+    kw = {'capstyle': 'projecting', 'zorder': 2, **kw}   # the Line2D defaults of ax.plot
+    lc = LineCollection(segments, colors=edge_colors(color, alpha, len(segments)), linewidths=lw, **kw)
+    ax.add_collection(lc)
+    return lc
+
+def path_layer(ax, paths, **kw):
+    """All non-empty paths (lists of (x,y) cells) as one LineCollection."""
+    kw = {'capstyle': 'projecting', 'joinstyle': 'round', 'zorder': 2, **kw}
+    lc = LineCollection([np.asarray(p, dtype=float) for p in paths if p], **kw)
+    ax.add_collection(lc)
+    return lc
+
+# ---------------------------------------
+# Figures and output
+# ---------------------------------------
+def new_figure(figsize, out=None):
+    """plt.subplots for interactive use; a pyplot-free Figure when rendering to `out`."""
+    if out is None:
+        return plt.subplots(figsize=figsize)
+    fig = Figure(figsize=figsize)
+    return fig, fig.add_subplot()
+
+def grid_axes(ax, width, height):
+    """Cell-centred limits of a width x height grid, y pointing down like the obstacle masks."""
+    ax.set_xlim(-0.5, width - 0.5)
+    ax.set_ylim(-0.5, height - 0.5)
+    ax.set_aspect('equal')
+    ax.invert_yaxis()
+
+def show_or_save(fig, out=None, dpi=150):
+    """plt.show() without `out`; otherwise write the figure (format from the extension) and return the path."""
+    if out is None:
+        plt.show()
+        return None
+    fig.savefig(out, dpi=dpi, bbox_inches='tight')
+    return out
+
+def save_animation(fig, update, n_frames, out, fps=5, dpi=100):
+    """Render `update(frame)` for every frame to `out`: .gif through Pillow, anything else (.mp4) through ffmpeg."""
+    writer = 'pillow' if out.lower().endswith('.gif') else 'ffmpeg'
+    if not writers.is_available(writer):
+        raise RuntimeError(f"no {writer} movie writer available for {out}; export .gif or .png instead")
+    FuncAnimation(fig, update, frames=n_frames, repeat=False).save(out, writer=writer, fps=fps, dpi=dpi)
+    return out
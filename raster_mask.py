@@ -0,0 +1,126 @@
+# raster_mask.py
+import gzip
+import hashlib
+import json
+import os
+import numpy as np
+
+# ---------------------------------------
+# Boundary polygons from GeoJSON / GEOJSONL
+# ---------------------------------------
+def _open(path):
+    return gzip.open(path, 'rt', encoding='utf-8') if path.endswith('.gz') else open(path, encoding='utf-8')
+
+def _features(path):
+    """Yield Feature dicts from a GeoJSON file (FeatureCollection, Feature or bare geometry) or GEOJSONL (.gz ok)."""
+    with _open(path) as f:
+        if path.removesuffix('.gz').endswith(('.geojsonl', '.jsonl')):
+            objs = (json.loads(line) for line in f if line.strip())
+        else:
+            obj = json.load(f)
+            objs = obj.get('features', []) if obj.get('type') == 'FeatureCollection' else [obj]
+        for obj in objs:
+            if obj.get('type') == 'Feature':
+                yield obj
+            else:
+                yield {"type": "Feature", "geometry": obj, "properties": {}}
+
+def read_rings(path, where=None):
+    """
+    All polygon rings (outer and holes) of the Polygon/MultiPolygon features
+    in `path`, as (k,2) lon/lat arrays. `where` keeps only features whose
+    properties match every key/value given, e.g. {"NAME": "Texas"}.
+    """
+    rings = []
+    for feat in _features(path):
+        props = feat.get('properties') or {}
+        if where and any(props.get(k) != v for k, v in where.items()):
+            continue
+        geom = feat.get('geometry') or {}
+        if geom.get('type') == 'Polygon':
+            polys = [geom['coordinates']]
+        elif geom.get('type') == 'MultiPolygon':
+            polys = geom['coordinates']
+        else:
+            continue
+        for poly in polys:
+            rings.extend(np.asarray(r, dtype=float)[:, :2] for r in poly)
+    return rings
+
+# ---------------------------------------
+# Scanline rasterizer
+# ---------------------------------------
+def rasterize_rings(rings, bounds, cell, rows_per_chunk=256):
+    """
+    Inside mask (height, width) of `rings` under the even-odd rule, so holes
+    and multipolygons need no special casing. Row 0 is the northern edge;
+    cell (x,y) covers lon [west + x*cell, ...), lat (north - (y+1)*cell, ...].
+    Each chunk of rows intersects every polygon edge at once; the crossings
+    are toggled into a parity array and prefix-summed along each row.
+    """
+    west, south, east, north = bounds
+    width = max(int(np.ceil((east - west) / cell)), 1)
+    height = max(int(np.ceil((north - south) / cell)), 1)
+    a = np.concatenate([r for r in rings])
+    b = np.concatenate([np.roll(r, -1, axis=0) for r in rings])
+    x0, y0, x1, y1 = a[:, 0], a[:, 1], b[:, 0], b[:, 1]
+    mask = np.zeros((height, width), dtype=bool)
+    for start in range(0, height, rows_per_chunk):
+        yc = north - (np.arange(start, min(start + rows_per_chunk, height)) + 0.5) * cell
+        r, e = np.nonzero((y0[None, :] <= yc[:, None]) != (y1[None, :] <= yc[:, None]))
+        t = (yc[r] - y0[e]) / (y1[e] - y0[e])
+        xs = x0[e] + t * (x1[e] - x0[e])
+        # first cell whose centre lies east of the crossing
+        col = np.clip(np.ceil((xs - west) / cell - 0.5).astype(np.int64), 0, width)
+        toggles = np.zeros((len(yc), width + 1), dtype=np.int64)
+        np.add.at(toggles, (r, col), 1)
+        mask[start:start + len(yc)] = (np.cumsum(toggles, axis=1)[:, :width] & 1).astype(bool)
+    return mask
+
+# ---------------------------------------
+# Cached boundary -> obstacle mask
+# ---------------------------------------
+def boundary_mask(path, cell, where=None, cache_dir=None):
+    """
+    Blocked-cell mask (True outside the boundary) for a GeoJSON/GEOJSONL
+    boundary at `cell` degrees, plus its transform (west, north, cell).
+    Results are stored as .npz keyed by (file hash, cell, where) in
+    `cache_dir` (default: `.mask_cache` beside the boundary file).
+    """
+    h = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    h.update(repr((float(cell), sorted((where or {}).items()))).encode())
+    cache_dir = cache_dir or os.path.join(os.path.dirname(os.path.abspath(path)), '.mask_cache')
+    cache_file = os.path.join(cache_dir, h.hexdigest() + '.npz')
+    if os.path.exists(cache_file):
+        with np.load(cache_file) as z:
+            return z['blocked'], tuple(z['transform'].tolist())
+
+    rings = read_rings(path, where)
+    if not rings:
+        raise ValueError(f"no polygon features in {path}")
+    pts = np.concatenate(rings)
+    west, south = pts.min(axis=0)
+    east, north = pts.max(axis=0)
+    blocked = ~rasterize_rings(rings, (west, south, east, north), cell)
+    transform = (float(west), float(north), float(cell))
+    os.makedirs(cache_dir, exist_ok=True)
+    np.savez_compressed(cache_file, blocked=blocked, transform=np.array(transform))
+    return blocked, transform
+
+def lonlat_to_cell(lon, lat, transform):
+    """Grid cell (x, y) holding the point (lon, lat)."""
+    west, north, cell = transform
+    return int((lon - west) // cell), int((north - lat) // cell)
+
+def nearest_open_cell(blocked, cell):
+    """Snap (x, y) to the closest unblocked cell, e.g. a coastal city that fell in the sea."""
+    x, y = cell
+    h, w = blocked.shape
+    if 0 <= x < w and 0 <= y < h and not blocked[y, x]:
+        return (x, y)
+    open_yx = np.argwhere(~blocked)
+    k = np.argmin((open_yx[:, 1] - x) ** 2 + (open_yx[:, 0] - y) ** 2)
+    return (int(open_yx[k, 1]), int(open_yx[k, 0]))
@@ -1,53 +1,46 @@
 # texas_aco.py
 import numpy as np
-import matplotlib.pyplot as plt
 import random
+import sys
+import time
 from collections import defaultdict
 from heapq import heappush, heappop
+from aco_engine import vectorized_colony_path, island_colony_path, network_colony
+from csr_graph import grid_graph, obstacle_cells
+from raster_mask import boundary_mask, lonlat_to_cell, nearest_open_cell
+from network_plot import new_figure, grid_axes, edge_segments, edge_layer, path_layer, show_or_save
 
 # ---------------------------------------
 # Approximate Texas shape as boolean mask
 # ---------------------------------------
 def texas_mask(width=60, height=50):
-    """Returns a set of blocked (x,y) coordinates forming an approximate Texas outline."""
-    blocked = set()
-    for y in range(height):
-        for x in range(width):
-            # Rough polygonal cutoff to mimic Texas shape
-            if (
-                y < 10 and (x < 15 or x > 45)
-                or (y >= 10 and y < 20 and (x < 10 or x > 50))
-                or (y >= 20 and y < 30 and (x < 5 or x > 55))
-                or (y >= 30 and y < 40 and (x < 8 or x > 52))
-                or (y >= 40 and x < 20)
-            ):
-                blocked.add((x, y))
-    return blocked
-
-# ---------------------------------------
-# Grid and graph builder
-# ---------------------------------------
-def grid_graph(width, height, obstacles=None, diag=True):
-    obstacles = obstacles or set()
-    nodes, edges = [], []
-    dirs = [(1,0),(-1,0),(0,1),(0,-1)]
-    if diag: dirs += [(1,1),(1,-1),(-1,1),(-1,-1)]
-    def inside(x,y): return 0<=x<width and 0<=y<height and (x,y) not in obstacles
-    for y in range(height):
-        for x in range(width):
-            if inside(x,y):
-                nodes.append((x,y))
-                for dx,dy in dirs:
-                    nx, ny = x+dx, y+dy
-                    if inside(nx,ny) and (x,y)<(nx,ny):
-                        edges.append(((x,y),(nx,ny)))
-    return nodes, edges
+    """Blocked-cell mask (height, width) forming an approximate Texas outline."""
+    y, x = np.mgrid[:height, :width]
+    # Rough polygonal cutoff to mimic Texas shape
+    return (
+        (y < 10) & ((x < 15) | (x > 45))
+        | (y >= 10) & (y < 20) & ((x < 10) | (x > 50))
+        | (y >= 20) & (y < 30) & ((x < 5) | (x > 55))
+        | (y >= 30) & (y < 40) & ((x < 8) | (x > 52))
+        | (y >= 40) & (x < 20)
+    )
 
 # ---------------------------------------
 # Ant colony optimization
 # ---------------------------------------
 def ant_colony_path(nodes, edges, source, sink, n_ants=100, n_iter=250,
-                    alpha=1.0, beta=4.0, rho=0.3, Q=100):
+                    alpha=1.0, beta=4.0, rho=0.3, Q=100, engine="dict",
+                    heuristic="length", n_candidates=None, log_every=25, callback=None):
+    """
+    `callback(iteration, info)` gets best_cost/best_iter/n_ok/n_ants after every
+    iteration (either engine); log_every=0 turns the progress prints off.
+    """
+    if engine == "vectorized":
+        pheromone, best_path, _ = vectorized_colony_path(nodes, edges, source, sink, n_ants, n_iter,
+                                                         alpha, beta, rho, Q, heuristic=heuristic,
+                                                         n_candidates=n_candidates, log_every=log_every,
+                                                         callback=callback)
+        return pheromone, best_path
     nbrs = defaultdict(list)
     length = {}
     for (u,v) in edges:
@@ -55,16 +48,22 @@ def ant_colony_path(nodes, edges, source, sink, n_ants=100, n_iter=250,
         length[(u,v)] = length[(v,u)] = np.hypot(v[0]-u[0], v[1]-u[1])
     pheromone = {(u,v):1.0 for (u,v) in edges}
     pheromone.update({(v,u):1.0 for (u,v) in edges})
+    eta = heuristic_eta(sink, nbrs, length, heuristic)
+    cand = None
+    if n_candidates:
+        cand = {u: sorted(vs, key=lambda v: -eta[(u,v)])[:n_candidates] for u, vs in nbrs.items()}
 
-    best_path, best_cost = None, float('inf')
+    best_path, best_cost, best_iter = None, float('inf'), None
     for iteration in range(n_iter):
+        # tau**alpha * eta**beta only changes when pheromone does
+        cache = cached_choices(nbrs, cand, length, pheromone, eta, alpha, beta)
         all_paths=[]
         for _ in range(n_ants):
-            path, cost = construct_path(source, sink, nbrs, length, pheromone, alpha, beta)
+            path, cost = construct_path(source, sink, nbrs, length, pheromone, alpha, beta, cache)
             if path:
                 all_paths.append((path, cost))
                 if cost < best_cost:
-                    best_path, best_cost = path, cost
+                    best_path, best_cost, best_iter = path, cost, iteration
         # evaporate + reinforce
         for e in pheromone: pheromone[e] *= (1 - rho)
         for path, cost in all_paths:
@@ -72,23 +71,66 @@ def ant_colony_path(nodes, edges, source, sink, n_ants=100, n_iter=250,
                 u,v = path[i], path[i+1]
                 pheromone[(u,v)] += Q/cost
                 pheromone[(v,u)] += Q/cost
-        if iteration % 25 == 0:
+        if callback is not None:
+            callback(iteration, dict(best_cost=best_cost, best_iter=best_iter,
+                                     n_ok=len(all_paths), n_ants=n_ants))
+        if log_every and iteration % log_every == 0:
             print(f"Iter {iteration:3d} | best = {best_cost:.2f}")
     return pheromone, best_path
 
-def construct_path(source, sink, nbrs, length, pheromone, alpha, beta):
+def distance_to_sink(sink, nbrs, length):
+    """One Dijkstra from the sink; edges are undirected so this is distance-to-sink."""
+    dist = {sink: 0.0}
+    pq = [(0.0, sink)]
+    while pq:
+        d, u = heappop(pq)
+        if d != dist[u]: continue
+        for v in nbrs[u]:
+            nd = d + length[(u,v)]
+            if nd < dist.get(v, float('inf')):
+                dist[v] = nd
+                heappush(pq, (nd, v))
+    return dist
+
+def heuristic_eta(sink, nbrs, length, heuristic="length"):
+    """
+    eta per directed edge. "length" is the classic 1/length; "goal" is
+    1/(1 + detour) with detour = l(u,v) + h(v) - h(u), h the distance to the sink.
+    """
+    if heuristic == "length":
+        return {e: 1/l for e, l in length.items()}
+    if heuristic == "goal":
+        h = distance_to_sink(sink, nbrs, length)
+        inf = float('inf')
+        return {(u,v): 0.0 if v not in h else 1/(1 + max(0.0, l + h[v] - h.get(u, inf)))
+                for (u,v), l in length.items()}
+    raise ValueError(f"unknown heuristic: {heuristic}")
+
+def cached_choices(nbrs, cand, length, pheromone, eta, alpha, beta):
+    """
+    (primary, fallback) per-node lists of (neighbour, tau**alpha*eta**beta, length).
+    With candidate lists, primary holds only the best-eta neighbours and
+    fallback the full neighbourhood.
+    """
+    def weights(table):
+        return {u: [(v, pheromone[(u,v)]**alpha * eta[(u,v)]**beta, length[(u,v)]) for v in vs]
+                for u, vs in table.items()}
+    full = weights(nbrs)
+    return (weights(cand), full) if cand is not None else (full, None)
+
+def construct_path(source, sink, nbrs, length, pheromone, alpha, beta, cache=None):
     path=[source]; visited={source}; cost=0; current=source
     for _ in range(1000):
         if current==sink: return path, cost
-        choices=[]
-        total=0
-        for n in nbrs[current]:
-            if n not in visited:
-                tau=pheromone[(current,n)]**alpha
-                eta=(1/length[(current,n)])**beta
-                total+=tau*eta
-                choices.append((n,tau*eta,length[(current,n)]))
+        if cache is None:
+            choices=[(n,(pheromone[(current,n)]**alpha)*(1/length[(current,n)])**beta,length[(current,n)])
+                     for n in nbrs[current] if n not in visited]
+        else:
+            choices=[c for c in cache[0][current] if c[0] not in visited]
+            if not choices and cache[1] is not None:
+                choices=[c for c in cache[1][current] if c[0] not in visited]
         if not choices: return None, float('inf')
+        total=sum(p for _,p,_ in choices)
         r=random.random()*total; s=0
         for n,p,l in choices:
             s+=p
@@ -96,36 +138,86 @@ def construct_path(source, sink, nbrs, length, pheromone, alpha, beta):
                 path.append(n); visited.add(n); cost+=l; current=n; break
     return None, float('inf')
 
+def compare_heuristics(nodes, edges, source, sink, n_ants=100, n_iter=250, n_candidates=4, **kw):
+    """
+    Runs the vectorized engine with the length heuristic, the goal heuristic
+    and goal + candidate lists on the same seed and prints wall time,
+    iterations-to-best and the share of ants that never reached the sink.
+    """
+    rows = []
+    for heuristic, k in (("length", None), ("goal", None), ("goal", n_candidates)):
+        failed = []
+        t0 = time.perf_counter()
+        _, _, cost = vectorized_colony_path(
+            nodes, edges, source, sink, n_ants, n_iter, seed=0, log_every=0,
+            heuristic=heuristic, n_candidates=k,
+            callback=lambda it, info: failed.append((info['n_ants'] - info['n_ok'], info['best_iter'])), **kw)
+        wall = time.perf_counter() - t0
+        best_iter = failed[-1][1]
+        rows.append((f"{heuristic}{f' k={k}' if k else ''}", wall, cost, best_iter,
+                     sum(f for f, _ in failed) / (n_ants * n_iter)))
+    print(f"{'heuristic':<12}{'wall s':>8}{'best':>9}{'iter->best':>12}{'failed':>9}")
+    for name, wall, cost, best_iter, fail in rows:
+        print(f"{name:<12}{wall:8.2f}{cost:9.2f}{str(best_iter):>12}{fail:9.1%}")
+    return rows
+
+def island_speedup(nodes, edges, source, sink, n_workers=4, n_ants=100, n_iter=250, **kw):
+    """
+    Times one vectorized colony against `n_workers` islands (one seed each)
+    doing the same total work: the `n_ants` ants are split across the islands.
+    Prints both wall-clock times and best costs.
+    """
+    t0 = time.perf_counter()
+    _, _, single_cost = vectorized_colony_path(nodes, edges, source, sink, n_ants, n_iter,
+                                               seed=0, log_every=0, **kw)
+    t_single = time.perf_counter() - t0
+    per_island = max(1, n_ants // n_workers)
+    t0 = time.perf_counter()
+    pheromone, best_path, island_cost = island_colony_path(
+        nodes, edges, source, sink, seeds=tuple(range(n_workers)), n_workers=n_workers,
+        n_ants=per_island, n_iter=n_iter, log=False, **kw)
+    t_islands = time.perf_counter() - t0
+    print(f"single colony, {n_ants} ants: {t_single:.1f}s best={single_cost:.2f} | "
+          f"{n_workers} islands x {per_island} ants: {t_islands:.1f}s best={island_cost:.2f} | "
+          f"wall-clock speedup x{t_single / t_islands:.2f}")
+    return pheromone, best_path
+
 # ---------------------------------------
 # Visualization
 # ---------------------------------------
-def draw_texas_network(pheromone, width, height, obstacles, cities, best_path):
-    fig, ax = plt.subplots(figsize=(9,8))
-    ax.set_xlim(-0.5, width-0.5)
-    ax.set_ylim(-0.5, height-0.5)
-    ax.set_aspect('equal')
-    ax.invert_yaxis()
-
-    maxP = max(pheromone.values())
-    for (u,v),p in pheromone.items():
-        if p < 0.5: continue
-        (x1,y1),(x2,y2)=u,v
-        ax.plot([x1,x2],[y1,y2],color='deepskyblue',alpha=min(1,p/maxP),lw=2*(p/maxP))
-    if obstacles:
-        obs = np.array(list(obstacles))
+def draw_texas_network(pheromone, width, height, obstacles, cities, best_path, network_paths=None,
+                       edges=None, out=None):
+    """
+    Pheromone field (one line layer, alpha/width from p/max p) with the cities,
+    the best path and, in network mode, every pair's path as a second layer.
+    `pheromone` is the solver's edge dict, or a per-edge array with `edges`;
+    with `out` the figure is written there instead of shown.
+    """
+    fig, ax = new_figure((9,8), out)
+    grid_axes(ax, width, height)
+    seg, P = edge_segments(pheromone, edges)
+    keep = P >= 0.5
+    w = P[keep] / P.max()
+    edge_layer(ax, seg[keep], 'deepskyblue', alpha=np.minimum(1, w), lw=2*w)
+    obs = obstacle_cells(obstacles)
+    if len(obs):
         ax.scatter(obs[:,0], obs[:,1], s=15, c='lightgray', marker='s', alpha=0.6)
     # plot cities
+    xy = np.array(list(cities.values()), dtype=float)
+    ax.scatter(xy[:,0], xy[:,1], s=120, c='orange', edgecolors='black')
     for name,(x,y) in cities.items():
-        ax.scatter(x,y,s=120,c='orange',edgecolors='black')
-        ax.text(x+0.5,y,name,fontsize=9,ha='left',va='center')
+        ax.text(x+0.5, y, name, fontsize=9, ha='left', va='center')
     # best path
     if best_path:
         xs,ys = zip(*best_path)
-        ax.plot(xs,ys,color='yellow',lw=4,alpha=0.9,label='Best Path')
+        ax.plot(xs, ys, color='yellow', lw=4, alpha=0.9, label='Best Path')
+    # best path of every city pair in network mode
+    if any(network_paths or []):
+        path_layer(ax, network_paths, colors='gold', linewidths=2, alpha=0.8, label='Pair Paths')
     ax.legend(loc='upper right')
-    plt.title("Ant Colony Optimization - Texas Metro Network")
-    plt.axis('off')
-    plt.show()
+    ax.set_title("Ant Colony Optimization - Texas Metro Network")
+    ax.axis('off')
+    return show_or_save(fig, out)
 
 # ---------------------------------------
 # Demo run
@@ -147,10 +239,50 @@ if __name__=="__main__":
         "Corpus Christi": (35,40),
         "McAllen": (30,44)
     }
+    city_lonlat = {
+        "Dallas": (-96.797,32.777), "Houston": (-95.370,29.760), "Austin": (-97.743,30.267),
+        "San Antonio": (-98.494,29.424), "El Paso": (-106.485,31.762), "Lubbock": (-101.855,33.578),
+        "Amarillo": (-101.831,35.222), "Corpus Christi": (-97.396,27.801), "McAllen": (-98.230,26.203),
+        "Midland": (-102.078,31.997)
+    }
+    if "--boundary" in sys.argv:
+        # python texas_aco.py --boundary texas.geojson [--cell 0.2]
+        path = sys.argv[sys.argv.index("--boundary") + 1]
+        cell = float(sys.argv[sys.argv.index("--cell") + 1]) if "--cell" in sys.argv else 0.2
+        obstacles, transform = boundary_mask(path, cell)
+        H,W = obstacles.shape
+        cities = {c: nearest_open_cell(obstacles, lonlat_to_cell(*city_lonlat[c], transform)) for c in cities}
+        print(f"Rasterized {path} to {W}x{H} cells of {cell} deg")
 
+    # --out FILE.png renders headless instead of opening a window
+    out = sys.argv[sys.argv.index("--out") + 1] if "--out" in sys.argv else None
     nodes,edges=grid_graph(W,H,obstacles,diag=True)
     source="El Paso"; sink="Houston"
     print(f"Running ACO from {source} to {sink}...")
-    pheromone,best_path=ant_colony_path(nodes,edges,cities[source],cities[sink],
-        n_ants=100,n_iter=250,alpha=1.0,beta=5.0,rho=0.25,Q=80)
-    draw_texas_network(pheromone,W,H,obstacles,cities,best_path)
+    if "--compare-heuristics" in sys.argv:
+        compare_heuristics(nodes,edges,cities[source],cities[sink],
+            n_ants=100,n_iter=250,alpha=1.0,beta=5.0,rho=0.25,Q=80)
+    if "--network" in sys.argv:
+        # all 36 city pairs share one graph and one pheromone field
+        print(f"Routing all pairs of {len(cities)} cities...")
+        pheromone,paths,costs=network_colony(nodes,edges,cities,ants_per_pair=10,n_iter=100,
+            alpha=1.0,beta=5.0,rho=0.25,Q=80,heuristic="goal")
+        # warm start: a tenth city only needs its own pairs
+        cities["Midland"]=(17,24) if "--boundary" not in sys.argv else \
+            nearest_open_cell(obstacles, lonlat_to_cell(*city_lonlat["Midland"], transform))
+        new_pairs=[(c,"Midland") for c in cities if c!="Midland"]
+        print("Adding Midland from the previous field...")
+        pheromone,new_paths,_=network_colony(nodes,edges,cities,pairs=new_pairs,pheromone=pheromone,
+            ants_per_pair=10,n_iter=30,alpha=1.0,beta=5.0,rho=0.25,Q=80,heuristic="goal")
+        paths.update(new_paths)
+        draw_texas_network(pheromone,W,H,obstacles,cities,None,list(paths.values()),out=out)
+        sys.exit()
+    if "--islands" in sys.argv:
+        # python texas_aco.py --islands 8
+        n_workers = int(sys.argv[sys.argv.index("--islands") + 1])
+        pheromone,best_path=island_speedup(nodes,edges,cities[source],cities[sink],n_workers,
+            n_ants=100,n_iter=250,alpha=1.0,beta=5.0,rho=0.25,Q=80)
+    else:
+        pheromone,best_path=ant_colony_path(nodes,edges,cities[source],cities[sink],
+            n_ants=100,n_iter=250,alpha=1.0,beta=5.0,rho=0.25,Q=80,engine="vectorized")
+    draw_texas_network(pheromone,W,H,obstacles,cities,best_path,out=out)